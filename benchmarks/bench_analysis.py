@@ -0,0 +1,66 @@
+"""
+Melt onset counting and jenks classification of synthetic SWE
+"""
+import time
+import swepy.classify as classify
+from swepy.analysis import Analysis
+from . import synthetic
+
+
+class CountMeltOnset:
+    """
+    Analysis.count_melt_onset over several years of daily SWE
+    """
+
+    params = [(1095, 64, 64), (3650, 128, 128)]
+    param_names = ["shape"]
+    number = 1
+    repeat = 3
+    timeout = 300
+
+    def setup(self, shape):
+        self.analysis = Analysis(
+            synthetic.START, synthetic.swe_cube(shape[0], shape[1:])
+        )
+
+    def time_count_melt_onset(self, shape):
+        self.analysis.count_melt_onset()
+
+    def peakmem_count_melt_onset(self, shape):
+        self.analysis.count_melt_onset()
+
+    def track_pixels_per_second(self, shape):
+        start = time.perf_counter()
+        self.analysis.count_melt_onset()
+        return self.analysis.swe.size / (time.perf_counter() - start)
+
+    track_pixels_per_second.unit = "pixels/s"
+
+
+class OptimalJenk:
+    """
+    classify.optimal_jenk on a winter day of SWE
+    """
+
+    params = [(64, 64), (128, 128)]
+    param_names = ["shape"]
+    number = 1
+    repeat = 3
+    timeout = 300
+
+    def setup(self, shape):
+        cube = synthetic.swe_cube(60, shape)
+        self.image = cube[-1].compressed()
+
+    def time_optimal_jenk(self, shape):
+        classify.optimal_jenk(self.image, 0.9)
+
+    def peakmem_optimal_jenk(self, shape):
+        classify.optimal_jenk(self.image, 0.9)
+
+    def track_pixels_per_second(self, shape):
+        start = time.perf_counter()
+        classify.optimal_jenk(self.image, 0.9)
+        return self.image.size / (time.perf_counter() - start)
+
+    track_pixels_per_second.unit = "pixels/s"
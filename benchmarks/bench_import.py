@@ -0,0 +1,15 @@
+"""
+Start up cost of the modules worker processes and scripts import
+"""
+
+
+class Import:
+    """
+    Import time of SWEpy modules in a fresh interpreter
+    """
+
+    params = ["swepy.pipeline", "swepy.process", "swepy.analysis"]
+    param_names = ["module"]
+
+    def timeraw_import(self, module):
+        return "import {}".format(module)
@@ -0,0 +1,248 @@
+"""
+Download, subset and concatenate stages of the pipeline on synthetic files
+"""
+import os
+import shutil
+import tempfile
+import threading
+import time
+from swepy.nsidcDownloader import nsidcDownloader
+from swepy.pipeline import Swepy
+from swepy.tests.mock_server import HTTPHandler, HTTPServer
+from . import synthetic
+
+
+class QuietHandler(HTTPHandler):
+    """
+    mock_server handler that doesn't log every request to stderr
+    """
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve(root):
+    """
+    Serve root with the mock server on a free local port
+
+    Returns
+    -------
+    (server, "localhost:<port>")
+    """
+    server = HTTPServer(root, ("localhost", 0), QuietHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server, "localhost:{}".format(server.server_address[1])
+
+
+def make_swepy(folder, shape):
+    """
+    Swepy object in folder subsetting the center of a synthetic grid
+    """
+    s = Swepy(folder)
+    s.geo_list = synthetic.geo_list(shape)
+    s.subBool = True
+    return s
+
+
+class MockSwepy(Swepy):
+    """
+    Swepy downloading from a mock server on any port, get_file only knows
+    localhost:8000
+    """
+
+    host = None
+
+    def get_file(self, date, channel):
+        return {**super().get_file(date, channel), "server": self.host}
+
+
+class Download:
+    """
+    Swepy.scrape downloading every file of the archive from the mock server
+    """
+
+    params = ([10, 30], [1, 4])
+    param_names = ["days", "max_workers"]
+    number = 1
+    repeat = 3
+    timeout = 300
+
+    def setup(self, days, max_workers):
+        # scrape skips files it already has, so every sample starts from
+        # an empty download folder (asv runs setup once per repeat)
+        self.cwd = os.getcwd()
+        self.tmp = tempfile.mkdtemp()
+        self.files = synthetic.make_archive(
+            os.path.join(self.tmp, "pool"), days, shape=(128, 128)
+        )
+        self.server, host = serve(os.path.join(self.tmp, "pool"))
+        self.s = MockSwepy(self.tmp)
+        self.s.host = host
+        self.s.grid = "N"
+        self.s.local_session = True
+        self.s.nD = nsidcDownloader(folder=self.s.wget, no_auth=True)
+        self.s.set_dates(self.files[0][0], self.files[-1][0])
+
+    def teardown(self, days, max_workers):
+        self.s.close()
+        self.server.shutdown()
+        self.server.server_close()
+        os.chdir(self.cwd)
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def download(self, max_workers):
+        self.s.scrape(max_workers=max_workers)
+        assert self.s.failed_downloads == []
+
+    def time_download(self, days, max_workers):
+        self.download(max_workers)
+
+    def peakmem_download(self, days, max_workers):
+        self.download(max_workers)
+
+    def track_files_per_second(self, days, max_workers):
+        start = time.perf_counter()
+        self.download(max_workers)
+        return len(self.files) / (time.perf_counter() - start)
+
+    track_files_per_second.unit = "files/s"
+
+    def track_mb_per_second(self, days, max_workers):
+        start = time.perf_counter()
+        self.download(max_workers)
+        size = synthetic.file_size(path for _, _, path in self.files)
+        return size / (time.perf_counter() - start)
+
+    track_mb_per_second.unit = "MB/s"
+
+
+class Subset:
+    """
+    Swepy.subset with the in process netCDF engine
+
+    subset removes its inputs, so every sample gets fresh copies in setup
+    (asv runs setup once per repeat and number is 1).
+    """
+
+    params = ([(128, 128), (512, 512)], [1, 4])
+    param_names = ["shape", "workers"]
+    number = 1
+    repeat = 3
+    timeout = 300
+    days = 10
+
+    def setup(self, shape, workers):
+        self.cwd = os.getcwd()
+        self.tmp = tempfile.mkdtemp()
+        self.files = synthetic.make_archive(
+            os.path.join(self.tmp, "pool"), self.days, shape=shape
+        )
+        self.s = make_swepy(self.tmp, shape)
+        for date, channel, path in self.files:
+            shutil.copy(path, self.s.wget)
+            name = os.path.basename(path)
+            if channel == "19H":
+                self.s.down19list.append(name)
+            else:
+                self.s.down37list.append(name)
+        self.pixels = shape[0] * shape[1] * 5 * self.days
+
+    def teardown(self, shape, workers):
+        self.s.manifest.close()
+        os.chdir(self.cwd)
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def subset(self, workers):
+        self.s.subset(engine="netcdf", workers=workers)
+
+    def time_subset(self, shape, workers):
+        self.subset(workers)
+
+    def peakmem_subset(self, shape, workers):
+        self.subset(workers)
+
+    def track_files_per_second(self, shape, workers):
+        start = time.perf_counter()
+        self.subset(workers)
+        return len(self.files) / (time.perf_counter() - start)
+
+    track_files_per_second.unit = "files/s"
+
+    def track_mb_per_second(self, shape, workers):
+        size = synthetic.file_size(
+            os.path.join(self.s.wget, name)
+            for name in self.s.down19list + self.s.down37list
+        )
+        start = time.perf_counter()
+        self.subset(workers)
+        return size / (time.perf_counter() - start)
+
+    track_mb_per_second.unit = "MB/s"
+
+    def track_pixels_per_second(self, shape, workers):
+        # 19H pixels plus four times as many 37H pixels, per day
+        start = time.perf_counter()
+        self.subset(workers)
+        return self.pixels / (time.perf_counter() - start)
+
+    track_pixels_per_second.unit = "pixels/s"
+
+
+class Concatenate:
+    """
+    Swepy.concatenate of subsetted daily files into one file per channel
+    """
+
+    params = ([30, 365], ["netcdf"], [1, 4])
+    param_names = ["days", "engine", "workers"]
+    number = 1
+    repeat = 3
+    timeout = 600
+    shape = (64, 64)
+
+    def setup(self, days, engine, workers):
+        self.cwd = os.getcwd()
+        self.tmp = tempfile.mkdtemp()
+        self.s = make_swepy(self.tmp, self.shape)
+        self.files = synthetic.make_archive(
+            os.path.join(self.tmp, "pool"), days, shape=self.shape
+        )
+        for date, channel, path in self.files:
+            folder = self.s.path19 if channel == "19H" else self.s.path37
+            shutil.copy(path, folder)
+            outfile = os.path.join(folder, os.path.basename(path))
+            if channel == "19H":
+                self.s.sub19list.append(outfile)
+            else:
+                self.s.sub37list.append(outfile)
+        os.chdir(self.tmp)
+
+    def teardown(self, days, engine, workers):
+        self.s.manifest.close()
+        os.chdir(self.cwd)
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def concatenate(self, engine, workers):
+        self.s.concatenate(engine=engine, workers=workers)
+
+    def time_concatenate(self, days, engine, workers):
+        self.concatenate(engine, workers)
+
+    def peakmem_concatenate(self, days, engine, workers):
+        self.concatenate(engine, workers)
+
+    def track_files_per_second(self, days, engine, workers):
+        start = time.perf_counter()
+        self.concatenate(engine, workers)
+        return len(self.files) / (time.perf_counter() - start)
+
+    track_files_per_second.unit = "files/s"
+
+    def track_mb_per_second(self, days, engine, workers):
+        size = synthetic.file_size(self.s.sub19list + self.s.sub37list)
+        start = time.perf_counter()
+        self.concatenate(engine, workers)
+        return size / (time.perf_counter() - start)
+
+    track_mb_per_second.unit = "MB/s"
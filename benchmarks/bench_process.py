@@ -0,0 +1,34 @@
+"""
+Smoothing of SWE cubes with process.apply_filter
+"""
+import time
+import swepy.process as process
+from . import synthetic
+
+
+class ApplyFilter:
+    """
+    process.apply_filter on a synthetic masked SWE cube
+    """
+
+    params = ([(365, 64, 64), (730, 128, 128)], ["pool", "vector"])
+    param_names = ["shape", "engine"]
+    number = 1
+    repeat = 3
+    timeout = 600
+
+    def setup(self, shape, engine):
+        self.cube = synthetic.swe_cube(shape[0], shape[1:])
+
+    def time_apply_filter(self, shape, engine):
+        process.apply_filter(self.cube, engine=engine)
+
+    def peakmem_apply_filter(self, shape, engine):
+        process.apply_filter(self.cube, engine=engine)
+
+    def track_pixels_per_second(self, shape, engine):
+        start = time.perf_counter()
+        process.apply_filter(self.cube, engine=engine)
+        return self.cube.size / (time.perf_counter() - start)
+
+    track_pixels_per_second.unit = "pixels/s"
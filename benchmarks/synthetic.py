@@ -0,0 +1,247 @@
+"""
+Synthetic NSIDC-0630 style data for the benchmarks
+
+Files look like the MEaSUREs EASE-Grid 2.0 TB files SWEpy downloads
+(packed uint16 TB with _FillValue 0, x/y map coordinates in meters, time in
+days since 1972-01-01 and a crs grid mapping) but are generated locally, so
+grid size, number of days and the masked (ocean) fraction can be chosen
+freely. 37H files cover the same extent as 19H at twice the resolution.
+"""
+import os
+from datetime import datetime, timedelta
+import numpy as np
+import numpy.ma as ma
+from netCDF4 import Dataset, date2num
+from swepy.nsidcDownloader import nsidcDownloader
+
+# cell size (m) and resolution name of every channel
+CELLS = {"19H": (6250.0, "6.25km"), "37H": (3125.0, "3.125km")}
+
+TIME_UNITS = "days since 1972-01-01 00:00:00"
+
+START = datetime(2010, 1, 1)
+
+
+def grid(shape, channel="19H"):
+    """
+    x and y cell centers of a grid of shape (y, x) 19H cells centered on
+    the pole
+
+    Parameters
+    ----------
+    shape: (int, int)
+        (y, x) size of the 19H grid, 37H grids are twice as large
+    channel: str
+        19H vs 37H channel
+    """
+    cell = CELLS[channel][0]
+    factor = 2 if channel == "37H" else 1
+    ny, nx = shape[0] * factor, shape[1] * factor
+    x = (np.arange(nx) - nx / 2 + 0.5) * cell
+    y = (ny / 2 - 0.5 - np.arange(ny)) * cell
+    return x, y
+
+
+def geo_list(shape, fraction=0.5):
+    """
+    [x_ul, y_ul, x_lr, y_lr] bounds of the central part of a synthetic
+    grid, what Swepy.get_xy would give for a study area
+
+    Parameters
+    ----------
+    shape: (int, int)
+        (y, x) size of the 19H grid
+    fraction: float
+        share of each axis inside the bounds
+    """
+    half_x = shape[1] * CELLS["19H"][0] * fraction / 2
+    half_y = shape[0] * CELLS["19H"][0] * fraction / 2
+    return [-half_x, half_y, half_x, -half_y]
+
+
+def ocean(shape, mask_fraction, seed=0):
+    """
+    Boolean (y, x) mask with mask_fraction of the cells set, the cells
+    written as _FillValue on every day
+    """
+    rng = np.random.RandomState(seed)
+    return rng.random_sample(shape) < mask_fraction
+
+
+def tb_image(date, channel, shape, mask_fraction=0.1, seed=0):
+    """
+    TB (K) of one day, a seasonal cycle with noise and 37H depressed by
+    winter snow; masked cells are masked
+    """
+    factor = 2 if channel == "37H" else 1
+    full = (shape[0] * factor, shape[1] * factor)
+    day = date.timetuple().tm_yday
+    rng = np.random.RandomState(
+        (seed * 1000003 + date.toordinal() * 2 + factor) % 2 ** 32
+    )
+    season = np.cos(2 * np.pi * (day - 15) / 365.25)
+    tb = 240.0 - 20.0 * season + rng.normal(0, 2.0, full)
+    if channel == "37H":
+        tb -= 15.0 * max(season, 0) * (1 + rng.random_sample(full))
+    mask = ocean(shape, mask_fraction, seed)
+    mask = np.repeat(np.repeat(mask, factor, axis=0), factor, axis=1)
+    return ma.masked_array(tb, mask=mask)
+
+
+def file_keys(date, channel):
+    """
+    url_template keys of the synthetic file for a date and channel, ready
+    for nsidcDownloader.download_file once protocol and server are added
+    """
+    return {
+        "resolution": CELLS[channel][1],
+        "platform": "F17",
+        "sensor": "SSMIS",
+        "date1": date,
+        "date2": date,
+        "channel": channel,
+    }
+
+
+def file_name(date, channel):
+    """
+    Relative path of the file on the data server, the file name is what
+    nsidcDownloader saves it as
+    """
+    keys = {**nsidcDownloader.defaults, **file_keys(date, channel)}
+    url = nsidcDownloader.url_template.format(**keys)
+    return url.split("/", 3)[3]
+
+
+def write_tb_file(
+    path, date, channel="19H", shape=(128, 128), mask_fraction=0.1, seed=0
+):
+    """
+    Write a single day TB file
+
+    Parameters
+    ----------
+    path: str
+        netCDF file to write
+    date: datetime
+        day of the file
+    channel: str
+        19H vs 37H channel
+    shape: (int, int)
+        (y, x) size of the 19H grid
+    mask_fraction: float
+        share of cells that are _FillValue (ocean)
+    seed: int
+        random seed, the mask only depends on it and shape
+    """
+    x, y = grid(shape, channel)
+    tb = tb_image(date, channel, shape, mask_fraction, seed)
+    with Dataset(path, "w") as dst:
+        dst.Conventions = "CF-1.6"
+        dst.title = "Synthetic SWEpy benchmark TB"
+        dst.createDimension("time", None)
+        dst.createDimension("y", len(y))
+        dst.createDimension("x", len(x))
+        crs = dst.createVariable("crs", "S1")
+        crs.grid_mapping_name = "lambert_azimuthal_equal_area"
+        crs.latitude_of_projection_origin = 90.0
+        crs.longitude_of_projection_origin = 0.0
+        crs.long_name = "EASE2_N{}".format(CELLS[channel][1])
+        time = dst.createVariable("time", "f8", ("time",))
+        time.units = TIME_UNITS
+        time.calendar = "gregorian"
+        time.axis = "T"
+        time[:] = [date2num(date, TIME_UNITS, "gregorian")]
+        for name, values in [("x", x), ("y", y)]:
+            var = dst.createVariable(name, "f8", (name,))
+            var.standard_name = "projection_{}_coordinate".format(name)
+            var.units = "meters"
+            var.axis = name.upper()
+            var[:] = values
+        var = dst.createVariable(
+            "TB", "u2", ("time", "y", "x"), zlib=True, fill_value=0
+        )
+        var.units = "K"
+        var.scale_factor = 0.01
+        var.add_offset = 0.0
+        var.grid_mapping = "crs"
+        var.frequency_and_polarization = channel
+        var[0] = tb
+    return path
+
+
+def make_archive(
+    root, days=10, shape=(128, 128), mask_fraction=0.1, start=START, seed=0
+):
+    """
+    Write 19H and 37H files for consecutive days laid out like the NSIDC
+    data pool, to serve with swepy/tests/mock_server.py
+
+    Parameters
+    ----------
+    root: str
+        directory the data pool is written to
+    days: int
+        number of days
+    shape: (int, int)
+        (y, x) size of the 19H grid
+    mask_fraction: float
+        share of cells that are _FillValue (ocean)
+    start: datetime
+        first day
+    seed: int
+        random seed
+
+    Returns
+    -------
+    list of (date, channel, path) of the written files, in date order
+    """
+    files = []
+    for i in range(days):
+        date = start + timedelta(days=i)
+        for channel in ["19H", "37H"]:
+            path = os.path.join(root, file_name(date, channel))
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            write_tb_file(path, date, channel, shape, mask_fraction, seed)
+            files.append((date, channel, path))
+    return files
+
+
+def swe_cube(days=365, shape=(64, 64), mask_fraction=0.1, seed=0):
+    """
+    Masked (time, y, x) SWE cube with a snow season every winter, noise and
+    the occasional spike, the input process and analysis work on
+
+    Parameters
+    ----------
+    days: int
+        length of the time axis, starting January 1st
+    shape: (int, int)
+        (y, x) size of every day
+    mask_fraction: float
+        share of cells masked on every day (ocean)
+    seed: int
+        random seed
+    """
+    rng = np.random.RandomState(seed)
+    t = np.arange(days)[:, np.newaxis, np.newaxis]
+    peak = rng.uniform(50, 200, shape)
+    # melt out between late April and early July, varying by pixel
+    melt = rng.uniform(110, 185, shape)
+    day = t % 365
+    winter = np.where(day < melt, day + 365 - 300, day - 300)
+    season = np.clip(winter / (melt + 65), 0, 1)
+    swe = np.where((day < melt) | (day >= 300), peak * season, 0.0)
+    swe = swe + rng.normal(0, 2.0, swe.shape) * (swe > 0)
+    spikes = rng.random_sample(swe.shape) < 0.01
+    swe[spikes] += rng.uniform(50, 100, spikes.sum())
+    swe = np.clip(swe, 0, None)
+    mask = np.broadcast_to(ocean(shape, mask_fraction, seed), swe.shape)
+    return ma.masked_array(swe, mask=mask)
+
+
+def file_size(paths):
+    """
+    Total size in MB of a list of files
+    """
+    return sum(os.path.getsize(path) for path in paths) / 1e6
@@ -1,28 +1,59 @@
+import calendar
 import numpy as np
 import pandas as pd
-import matplotlib.pyplot as plt
 from netCDF4 import Dataset
-from multiprocessing import Pool, Process, cpu_count
-import math
+import numpy.ma as ma
+from swepy.lazy import lazy_import
+
+plt = lazy_import("matplotlib.pyplot")
+
+
+def _melt_counts(year_splits, swe):
+    """
+    Number of pixels of swe reaching zero for the first time of each year
+    on every day, the work behind Analysis._count_melt
+
+    Parameters
+    ----------
+    year_splits: list
+        indexes of the start of each year, see Analysis.year_index
+    swe: np.array
+        swe cube (should be clean and relatively smooth)
+    """
+    counts = np.zeros(np.shape(swe)[0], dtype=int)
+    for start, stop in zip(year_splits[:-1], year_splits[1:]):
+        # less than 5mm is zero (error), masked pixels never melt
+        zero = ma.filled(swe[start:stop] == 0, False)
+        melted = zero.any(axis=0)
+        # first zero day of every pixel that reaches zero this year
+        first = zero.argmax(axis=0)[melted] + start
+        counts += np.bincount(first, minlength=len(counts))
+    return counts
 
 
 class Analysis:
-    def __init__(self, start_date, swe):
+    def __init__(self, start_date, swe, water_year=False):
         """
         Parameters
         ----------
         start_date: datetime
             Day to start building time series off of
             Infer length from number of days in data
+        swe: np.array(t,x,y)
+            daily swe cube
+        water_year: bool
+            (Optional) split per year analyses on water years (October 1st
+            to September 30th, named after the year they end in) instead of
+            calendar years
         """
-        self.leap_years = [1992, 1996, 2000, 2004, 2008, 2012, 2016]
         self.swe = swe
         self.start_date = start_date
+        self.water_year = water_year
         self.time = pd.date_range(
             start_date, periods=np.shape(self.swe)[0], freq="D"
         )
         # self.melt_df = self.make_df(time)
-        self.year_splits = self.create_year_splits()
+        self.years, self.year_splits = self.year_index(water_year)
 
     def make_df(self, time=None, columns=["time", "count"]):
         """
@@ -49,6 +80,54 @@ class Analysis:
         df["count"].values[:] = 0
         return df
 
+    def year_index(self, water_year=False):
+        """
+        Index the start of every year in the time series
+
+        Parameters
+        ----------
+        water_year: bool
+            (Optional) use water years (October 1st to September 30th,
+            named after the year they end in) instead of calendar years
+
+        Returns
+        -------
+        (years, year_splits)
+            the year of every segment and the index of its first day, with
+            the length of the series appended, so year i is
+            swe[year_splits[i]:year_splits[i + 1]]
+        """
+        labels = self.time.year.values
+        if water_year:
+            labels = labels + (self.time.month.values >= 10)
+        starts = np.flatnonzero(np.diff(labels)) + 1
+        year_splits = [0] + starts.tolist() + [len(labels)]
+        return labels[year_splits[:-1]].tolist(), year_splits
+
+    def year_slices(self, water_year=None):
+        """
+        Slices of the time axis for every year in the time series
+
+        Parameters
+        ----------
+        water_year: bool
+            (Optional) use water years instead of calendar years, defaults
+            to the setting of the class
+
+        Returns
+        -------
+        dict: {year: slice}
+            slice of the time axis holding each year
+        """
+        if water_year is None or water_year == self.water_year:
+            years, splits = self.years, self.year_splits
+        else:
+            years, splits = self.year_index(water_year)
+        return {
+            year: slice(start, stop)
+            for year, start, stop in zip(years, splits[:-1], splits[1:])
+        }
+
     def create_year_splits(self):
         """
         Take time array from class and create an array of year split indexes
@@ -56,24 +135,11 @@ class Analysis:
         Returns
         -------
         year_splits: list
-            list of julian dates for the start of each year in time series
+            list of indexes for the start of each year in time series, the
+            first one is 0 and the length of the series is appended
         """
-        years = set(self.time.year)
-        years = list(years)
-        print("Years in time series: {}".format(years))
-        tt = self.start_date.timetuple()
-        if tt.tm_yday != 1:
-            year_splits = [tt.tm_yday]
-        else:
-            year_splits = [0]
-        for i, year in enumerate(years):
-            if years[i - 1] in self.leap_years:
-                year_splits.append(year_splits[-1] + 366)
-            else:
-                year_splits.append(year_splits[-1] + 365)
-        if year_splits[-1] > np.shape(self.swe)[0]:
-            year_splits[-1] = np.shape(self.swe)[0]
-        return year_splits
+        print("Years in time series: {}".format(self.years))
+        return list(self.year_splits)
 
     def _count_melt(self, swe):  # RENAME __COUNT
         """
@@ -86,47 +152,20 @@ class Analysis:
             swe cube (should be clean and relatively smooth)
         """
         melt_df = self.make_df(self.time)
-        for i, year in enumerate(
-            self.year_splits[0 : len(self.year_splits) - 1]
-        ):
-            # generate melt date boolean matrix
-            bool_1 = np.zeros((np.shape(swe)[1], np.shape(swe)[2]), dtype=bool)
-            # loop through the days of this year
-            for d in range(self.year_splits[i], self.year_splits[i + 1] - 1):
-                # loop through x and then y of the image
-                for x in range(np.shape(swe)[1]):
-                    for y in range(np.shape(swe)[2]):
-                        if bool_1[x, y] is False:
-                            if (
-                                swe[d, x, y] == 0
-                            ):  # less than 5mm is zero (error)
-                                melt_df.loc[d, "count"] += 1
-                                bool_1[x, y] = True
+        melt_df["count"] = _melt_counts(self.year_splits, swe)
         return melt_df
 
-    def count_melt_onset(self):  # RENAME, get rid of mp
+    def count_melt_onset(self):
         """
         Count the date that each pixel reaches zero for first time of season on a given date.
         Useful for comparison between years of a given region.
 
-        Helper function to manage multi-processing pool for counting
-        melt onset date. Use __count to use a single core
-
-        Parralelize on the 2nd axis (spatially)
-
         Returns
         -------
         df: pandas DataFrame
                 Count of melt dates of every pixel in image
         """
-        cpus = cpu_count()
-        swe_parts = np.array_split(self.swe, cpus, axis=2)
-        with Pool(cpus) as p:
-            parts = p.map(self._count_melt, swe_parts)
-            df = parts[0]  # recombine parts
-            for i in range(1, len(parts)):
-                df["count"] = df["count"].add(parts[i]["count"])
-            return df
+        return self._count_melt(self.swe)
 
     def mask_year_df(self, df, year):
         """
@@ -164,11 +203,51 @@ class Analysis:
             counts_dict[i] = df_dict[i]["count"].values
         return counts_dict
 
+    def summer_lengths(self, smooth_cube=None):
+        """
+        Length in days of the first snow free (zero swe) stretch of every
+        year, for every pixel
+
+        Years are the ones of year_index, pixels that never reach
+        zero in a year get 0 and stretches still running at the end of the
+        series are cut there.
+
+        Parameters
+        ----------
+        smooth_cube: np.array
+            smoothed (temporally) swe cube, defaults to the swe of the class
+
+        Returns
+        -------
+        lengths: np.array(n_years, x, y)
+            int16 summer lengths, one layer per year
+        """
+        if smooth_cube is None:
+            smooth_cube = self.swe
+        shape = np.shape(smooth_cube)
+        lengths = np.zeros(
+            (len(self.year_splits) - 1, shape[1], shape[2]), dtype=np.int16
+        )
+        for i, (start, stop) in enumerate(
+            zip(self.year_splits[:-1], self.year_splits[1:])
+        ):
+            zero = ma.filled(smooth_cube[start:stop] == 0, False)
+            days = np.arange(stop - start)[:, np.newaxis, np.newaxis]
+            first = zero.argmax(axis=0)
+            # first day with snow again after the summer started
+            snow = ~zero & (days > first)
+            end = np.where(snow.any(axis=0), snow.argmax(axis=0), stop - start)
+            lengths[i] = np.where(zero.any(axis=0), end - first, 0)
+        return lengths
+
     def summer_length(self, smooth_cube):
         """
         Function to track summer length for a pixel over each year
         Generates hash table of key:value = (x,y): summer length in days
 
+        Dictionary view of summer_lengths, which is the one to use on large
+        grids.
+
         Parameters
         ----------
         smooth_cube: np.array
@@ -177,42 +256,14 @@ class Analysis:
         Returns
         -------
         store: dict
-            dict using tuple (x,y) as hash key and list of summer lengths by year as key
+            dict using tuple (x,y) as hash key and dict of year: summer length as value
         """
-        shape = np.shape(smooth_cube)
+        lengths = self.summer_lengths(smooth_cube)
+        years = self.years
         store = {}
-        for x in range(shape[1]):
-            for y in range(shape[2]):
-                lengths = {}
-                firstofyear = True
-                f = 0
-                lastofyear = True
-                time = smooth_cube[:, x, y].tolist()
-                for index, val in enumerate(time, start=1):
-                    if index % 365 != 0:
-                        if val == 0 and firstofyear:
-                            f = index % 365
-                            firstofyear = False
-                        if val != 0 and firstofyear is False and lastofyear:
-                            summerlength = ((index - 1) % 365) - f
-                            lengths[
-                                math.floor(
-                                    (index / 365) + self.start_date.year
-                                )
-                            ] = (
-                                lengths.get(
-                                    math.floor(
-                                        (index / 365) + self.start_date.year
-                                    ),
-                                    0,
-                                )
-                                + summerlength
-                            )
-                            lastofyear = False
-                    else:
-                        firstofyear = True
-                        lastofyear = True
-                store[(x, y)] = lengths
+        for x in range(lengths.shape[1]):
+            for y in range(lengths.shape[2]):
+                store[(x, y)] = dict(zip(years, lengths[:, x, y].tolist()))
         return store
 
     def summer_diff(self, summer_dict, smooth_cube=None):
@@ -221,28 +272,34 @@ class Analysis:
 
         Parameters
         ----------
-        summer_dict: dict
-            dictionary containing the summer lengths of each year by pixel
+        summer_dict: np.array or dict
+            summer lengths by year and pixel, from summer_lengths or
+            summer_length
         smooth_cube: np.array(x,x,x)
             swe cube of clean swe data, OPTIONAL
+
+        Returns
+        -------
+        (mean change, diffmap)
+            average yearly change over all pixels and per pixel
         """
-        if smooth_cube is None:
-            smooth_cube = self.swe
-        shape = np.shape(smooth_cube)
-        diffmap = np.zeros((shape[1], shape[2]))
-        total_diff = 0
-        for key in summer_dict:  # grab new pixel dict
-            keys = list(summer_dict[key].keys())
-            diff = sum(
-                [
-                    summer_dict[keys[i]] - summer_dict[keys[i - 1]]
-                    for i in range(1, len(keys))
-                ]
+        if isinstance(summer_dict, dict):
+            if smooth_cube is None:
+                smooth_cube = self.swe
+            shape = np.shape(smooth_cube)
+            lengths = np.zeros(
+                (len(next(iter(summer_dict.values()))), shape[1], shape[2])
             )
-            diffmap[key[0], key[1]] = diff / 12
-            total_diff += diff / 6
+            for (x, y), years in summer_dict.items():
+                lengths[:, x, y] = [years[year] for year in sorted(years)]
+        else:
+            lengths = summer_dict
+        if len(lengths) < 2:
+            diffmap = np.zeros(np.shape(lengths)[1:])
+        else:
+            diffmap = np.diff(lengths.astype(float), axis=0).mean(axis=0)
         self.diffmap = diffmap
-        return total_diff / len(summer_dict.keys()), diffmap
+        return diffmap.mean(), diffmap
 
     def display_summer_change(self, interactive=False):
         """
@@ -285,8 +342,8 @@ class Analysis:
         fig: matplotlib.figure.Figure
             figure for future viz if desired
         """
-        len1 = 366 if year1 in self.leap_years else 365
-        len2 = 366 if year2 in self.leap_years else 365
+        len1 = 366 if calendar.isleap(year1) else 365
+        len2 = 366 if calendar.isleap(year2) else 365
         fig, ax = plt.subplots(1, 1, figsize=(15, 10))
         try:
             plt.bar(
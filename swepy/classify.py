@@ -1,10 +1,12 @@
 # Classify imagery from MEaSUREs
 
 import os
-import matplotlib.pyplot as plt
 import jenkspy
 import numpy as np
-from matplotlib import colors as c
+from swepy.lazy import lazy_import
+
+plt = lazy_import("matplotlib.pyplot")
+c = lazy_import("matplotlib.colors")
 
 
 def govf(array, classes):
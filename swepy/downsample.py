@@ -77,3 +77,59 @@ def downsample(im, block_size, func=np.sum, padval=0, f_kwargs=None):
     block = view_blocks(im, block_size)
 
     return func(block, axis=tuple(range(im.ndim, block.ndim)), **f_kwargs)
+
+
+def downsample_mean(im, block_size, dtype=None):
+    """
+    Downsample an image to the mean of the valid values of every block
+
+    Masked and nan values are left out of each block's mean instead of
+    being filled with a placeholder, blocks without any valid value come
+    out masked (masked input) or nan. Edges that don't fill a whole block
+    are averaged over the values they have.
+
+    Parameters
+    ----------
+    im: np.array or np.ma.MaskedArray
+        N-dim image
+    block_size: np.array
+        array with downsampling integer factor for each axis
+    dtype: np.dtype
+        (Optional) output dtype, defaults to float32 for integer or float32
+        input and float64 for float64 input. Sums are accumulated in
+        float64 either way.
+    """
+    if len(block_size) != im.ndim:
+        raise ValueError(
+            "`block_size` must have the same length " "as 'im.shape`."
+        )
+    if dtype is None:
+        dtype = np.result_type(im.dtype, np.float32)
+    masked = np.ma.isMaskedArray(im)
+    data = np.ma.getdata(im)
+    valid = ~np.ma.getmaskarray(im)
+    if np.issubdtype(data.dtype, np.inexact):
+        valid &= ~np.isnan(data)
+    values = np.where(valid, data, 0)
+
+    pad_width = []
+    for i in range(len(block_size)):
+        if block_size[i] < 1:
+            raise ValueError("Down-sampling factors must be >= 1")
+        pad_width.append((0, -im.shape[i] % block_size[i]))
+    if any(after for _, after in pad_width):
+        values = np.pad(values, pad_width, mode="constant")
+        valid = np.pad(valid, pad_width, mode="constant")
+
+    axes = tuple(range(im.ndim, 2 * im.ndim))
+    sums = view_blocks(values, tuple(block_size)).sum(
+        axis=axes, dtype=np.float64
+    )
+    counts = view_blocks(valid, tuple(block_size)).sum(axis=axes)
+    empty = counts == 0
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = (sums / counts).astype(dtype)
+    if masked:
+        return np.ma.masked_array(mean, mask=empty)
+    mean[empty] = np.nan
+    return mean
@@ -1,7 +1,9 @@
 from affine import Affine
+import numpy as np
 from osgeo import ogr, osr
 import re
 import sys
+import threading
 
 resolutions = ["25", "12.5", "6.25", "3.125"]
 
@@ -10,6 +12,43 @@ class EaseReproject:
     gridname = None
     epsg4326Proj4text = "+proj=longlat +ellps=WGS84 +datum=WGS84 +no_defs"
 
+    # instances shared by for_grid, keyed on gridname
+    _grids = {}
+    _grids_lock = threading.Lock()
+
+    @classmethod
+    def for_grid(cls, gridname, verbose=False):
+        """
+        easeReproject.EaseReproject.for_grid(gridname)
+
+        Returns the transform object for the given gridname, built on the
+        first call and shared by every later call in the process.
+
+        Parameters:
+            gridname: string
+                EASE-Grid 2.0 gridname, see EaseReproject
+            verbose: bool (optional)
+                If True, write verbose output to stderr when the object is
+                first built
+
+        Returns: initialized transformer for gridname
+
+        Example:
+
+        from swepy.easeReproject import EaseReproject
+        N25grid = EaseReproject.for_grid("EASE2_N25km")
+        """
+        with cls._grids_lock:
+            ease = cls._grids.get(gridname)
+            if ease is None:
+                ease = cls(gridname, verbose)
+                cls._grids[gridname] = ease
+        return ease
+
+    def __reduce__(self):
+        # osr objects can't be pickled, rebuild (once) in the other process
+        return (EaseReproject.for_grid, (self.gridname,))
+
     def __init__(self, gridname=None, verbose=False):
         """
         easeReproject.EaseReproject(gridname)
@@ -116,13 +155,9 @@ class EaseReproject:
         self.epsg4326SpatialRef = osr.SpatialReference()
         self.epsg4326SpatialRef.SetFromUserInput(self.epsg4326Proj4text)
 
-        # Initialize and save the forward and reverse transformations
-        self.projToGeog = osr.CoordinateTransformation(
-            self.gridSpatialRef, self.epsg4326SpatialRef
-        )
-        self.geogToProj = osr.CoordinateTransformation(
-            self.epsg4326SpatialRef, self.gridSpatialRef
-        )
+        # The forward and reverse transformations are created per thread,
+        # GDAL transformations can't be used by several threads at once
+        self._local = threading.local()
 
         if verbose:
             print(
@@ -131,6 +166,32 @@ class EaseReproject:
                 flush=True,
             )
 
+    @property
+    def projToGeog(self):
+        """
+        Grid to lat/lon transformation of the calling thread
+        """
+        transform = getattr(self._local, "projToGeog", None)
+        if transform is None:
+            transform = osr.CoordinateTransformation(
+                self.gridSpatialRef, self.epsg4326SpatialRef
+            )
+            self._local.projToGeog = transform
+        return transform
+
+    @property
+    def geogToProj(self):
+        """
+        Lat/lon to grid transformation of the calling thread
+        """
+        transform = getattr(self._local, "geogToProj", None)
+        if transform is None:
+            transform = osr.CoordinateTransformation(
+                self.epsg4326SpatialRef, self.gridSpatialRef
+            )
+            self._local.geogToProj = transform
+        return transform
+
     def grid_to_map(self, row, col):
         """
         swepy.easeReproject.EaseReproject.grid_to_map(row, col)
@@ -230,3 +291,102 @@ class EaseReproject:
         # returned values are in meters, convert to grid
         row, col = self.map_to_grid(point.GetX(), point.GetY())
         return (row, col)
+
+    def grid_to_map_array(self, rows, cols):
+        """
+        swepy.easeReproject.EaseReproject.grid_to_map_array(rows, cols)
+
+        Parameters: rows, cols : array_like
+                        grid locations to convert, broadcast together, grid
+                        origin defined as (row, col) = (0., 0.) at center of
+                        UL grid cell
+
+        Returns: (x, y) arrays of map coordinates in meters
+
+        Example:
+
+        from swepy.easeReproject import EaseReproject
+
+        N25grid = EaseReproject("EASE2_N25km")
+        (x, y) = N25grid.grid_to_map_array([-0.5, 719.5], [-0.5, 719.5])
+
+        Returns x = y * -1 = [-9000000., 9000000.], UL and LR corners
+        """
+        rows, cols = np.broadcast_arrays(
+            np.asarray(rows, dtype=np.float64),
+            np.asarray(cols, dtype=np.float64),
+        )
+        a, b, c, d, e, f = tuple(self.fwd)[:6]
+        return (a * cols + b * rows + c, d * cols + e * rows + f)
+
+    def map_to_grid_array(self, x, y):
+        """
+        swepy.easeReproject.EaseReproject.map_to_grid_array(x, y)
+
+        Parameters: x, y : array_like
+                        map locations (in meters) to convert, broadcast
+                        together
+        Returns: (rows, cols) arrays of grid coordinates, grid origin
+                        defined as (row, col) = (0., 0.) at center of UL
+                        grid cell
+        """
+        x, y = np.broadcast_arrays(
+            np.asarray(x, dtype=np.float64), np.asarray(y, dtype=np.float64)
+        )
+        a, b, c, d, e, f = tuple(~self.fwd)[:6]
+        return (d * x + e * y + f, a * x + b * y + c)
+
+    def grid_to_geographic_array(self, rows, cols):
+        """
+        swepy.easeReproject.EaseReproject.grid_to_geographic_array(rows, cols)
+
+        Parameters: rows, cols : array_like
+                        grid locations to convert, broadcast together, grid
+                        origin defined as (row, col) = (0., 0.) at center of
+                        UL grid cell
+
+        Returns: (lats, lons) arrays of geographic coordinates in degrees,
+                        transformed in a single call
+
+        Example:
+
+        import numpy as np
+        from swepy.easeReproject import EaseReproject
+
+        N25grid = EaseReproject("EASE2_N25km")
+        rows, cols = np.mgrid[0:720, 0:720]
+        (lats, lons) = N25grid.grid_to_geographic_array(rows, cols)
+        """
+        x, y = self.grid_to_map_array(rows, cols)
+        lons, lats = self._transform_array(self.projToGeog, x, y)
+        return (lats, lons)
+
+    def geographic_to_grid_array(self, lats, lons):
+        """
+        swepy.easeReproject.EaseReproject.geographic_to_grid_array(lats, lons)
+
+        Parameters: lats, lons : array_like
+                        geographic coordinates (in degrees) to convert,
+                        broadcast together
+
+        Returns: (rows, cols) arrays of grid locations, grid origin defined
+                        as (row, col) = (0., 0.) at center of UL grid cell
+        """
+        lats, lons = np.broadcast_arrays(
+            np.asarray(lats, dtype=np.float64),
+            np.asarray(lons, dtype=np.float64),
+        )
+        x, y = self._transform_array(self.geogToProj, lons, lats)
+        return self.map_to_grid_array(x, y)
+
+    @staticmethod
+    def _transform_array(transform, x, y):
+        """
+        Transform arrays of points with one TransformPoints call
+        """
+        shape = np.shape(x)
+        points = np.column_stack((np.ravel(x), np.ravel(y)))
+        if len(points) == 0:
+            return np.empty(shape), np.empty(shape)
+        out = np.asarray(transform.TransformPoints(points), dtype=np.float64)
+        return out[:, 0].reshape(shape), out[:, 1].reshape(shape)
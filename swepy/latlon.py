@@ -0,0 +1,157 @@
+import os
+import numpy as np
+from swepy.lazy import lazy_import
+
+easeReproject = lazy_import("swepy.easeReproject")
+
+
+def cache_dir():
+    """
+    Directory the lat/lon lookup tables are kept in
+
+    $SWEPY_CACHE_DIR if it is set, else swepy/ in $XDG_CACHE_HOME (which
+    defaults to ~/.cache)
+    """
+    folder = os.environ.get("SWEPY_CACHE_DIR")
+    if folder is None:
+        folder = os.path.join(
+            os.environ.get(
+                "XDG_CACHE_HOME",
+                os.path.join(os.path.expanduser("~"), ".cache"),
+            ),
+            "swepy",
+        )
+    return folder
+
+
+def grid_shape(ease):
+    """
+    (rows, cols) of an EASE-Grid 2.0 grid
+
+    Parameters
+    ----------
+    ease: EaseReproject
+        transform of the grid
+    """
+    rows = int(round(2 * abs(ease.map_UL_y) / abs(ease.scale_y)))
+    cols = int(round(2 * abs(ease.map_UL_x) / abs(ease.scale_x)))
+    return rows, cols
+
+
+def latlon_table(gridname, folder=None, block=256):
+    """
+    Latitude and longitude of the center of every cell of a grid
+
+    The tables are computed once per grid, block rows at a time, and kept
+    as float32 .npy files in the cache directory. Later calls map the files
+    read only instead of projecting again, so slices of them are views
+    that never read more of the file than they cover.
+
+    Parameters
+    ----------
+    gridname: str
+        EASE-Grid 2.0 gridname, e.g. "EASE2_N6.25km"
+    folder: str
+        (Optional) cache directory, defaults to cache_dir()
+    block: int
+        (Optional) number of rows projected at once when building a table
+
+    Returns
+    -------
+    (lats, lons)
+        read only np.memmap arrays of shape (rows, cols)
+    """
+    folder = cache_dir() if folder is None else folder
+    paths = [
+        os.path.join(folder, "{}_{}.npy".format(gridname, name))
+        for name in ["lat", "lon"]
+    ]
+    if not all(os.path.exists(path) for path in paths):
+        _build_table(gridname, folder, paths, block)
+    return tuple(np.load(path, mmap_mode="r") for path in paths)
+
+
+def _build_table(gridname, folder, paths, block):
+    """
+    Project every cell of a grid and write the lat/lon tables
+    """
+    ease = easeReproject.EaseReproject.for_grid(gridname)
+    rows, cols = grid_shape(ease)
+    os.makedirs(folder, exist_ok=True)
+    # written under temporary names so a partial table is never picked up
+    parts = [path + ".part" for path in paths]
+    lats, lons = [
+        np.lib.format.open_memmap(
+            part, mode="w+", dtype=np.float32, shape=(rows, cols)
+        )
+        for part in parts
+    ]
+    for start in range(0, rows, block):
+        grid_rows, grid_cols = np.mgrid[
+            start : min(start + block, rows), 0:cols
+        ]
+        lat, lon = ease.grid_to_geographic_array(grid_rows, grid_cols)
+        lats[start : start + block] = lat
+        lons[start : start + block] = lon
+    lats.flush()
+    lons.flush()
+    del lats, lons
+    for part, path in zip(parts, paths):
+        os.replace(part, path)
+
+
+def grid_window(ease, geo_list):
+    """
+    Rows and columns of the cells whose centers fall inside map bounds, the
+    cells the subset engines keep
+
+    Parameters
+    ----------
+    ease: EaseReproject
+        transform of the grid
+    geo_list: [float, float, float, float]
+        [x_ul, y_ul, x_lr, y_lr] map coordinates from Swepy.get_xy
+
+    Returns
+    -------
+    (rows, cols) slices
+    """
+    xmin, xmax = sorted([geo_list[0], geo_list[2]])
+    ymin, ymax = sorted([geo_list[1], geo_list[3]])
+    rows, cols = ease.map_to_grid_array([xmin, xmax], [ymax, ymin])
+    # bounds on a cell center are inside, like ncks and subset_window
+    rows = np.sort([np.ceil(rows[0] - 1e-6), np.floor(rows[1] + 1e-6)])
+    cols = np.sort([np.ceil(cols[0] - 1e-6), np.floor(cols[1] + 1e-6)])
+    shape = grid_shape(ease)
+    row0, row1 = np.clip(rows, 0, shape[0] - 1).astype(int)
+    col0, col1 = np.clip(cols, 0, shape[1] - 1).astype(int)
+    return slice(row0, row1 + 1), slice(col0, col1 + 1)
+
+
+def latlon_window(gridname, geo_list=None, folder=None):
+    """
+    Latitude and longitude of the cells of a subset, sliced out of the
+    cached tables without projecting anything
+
+    Parameters
+    ----------
+    gridname: str
+        EASE-Grid 2.0 gridname, e.g. "EASE2_N6.25km"
+    geo_list: [float, float, float, float]
+        (Optional) [x_ul, y_ul, x_lr, y_lr] map coordinates from
+        Swepy.get_xy, defaults to the whole grid
+    folder: str
+        (Optional) cache directory, defaults to cache_dir()
+
+    Returns
+    -------
+    (lats, lons)
+        read only views of shape (y, x), matching the TB subset
+    """
+    lats, lons = latlon_table(gridname, folder)
+    if geo_list is None:
+        return lats, lons
+    window = grid_window(
+        easeReproject.EaseReproject.for_grid(gridname), geo_list
+    )
+    return lats[window], lons[window]
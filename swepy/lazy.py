@@ -0,0 +1,56 @@
+import importlib
+import sys
+
+
+class LazyModule:
+    """
+    Stand in for a module that is only imported on first attribute access
+
+    Heavy dependencies (xarray, zarr, pandas, matplotlib, GDAL) cost more to
+    import than most short lived workers and command line calls spend
+    doing anything with them. Binding them through lazy_import keeps the
+    module level names the code already uses, and the import runs the
+    first time one of them is actually needed.
+    """
+
+    def __init__(self, name):
+        self.__dict__["_name"] = name
+        self.__dict__["_module"] = None
+
+    def _load(self):
+        module = self.__dict__["_module"]
+        if module is None:
+            module = importlib.import_module(self._name)
+            self.__dict__["_module"] = module
+        return module
+
+    def __getattr__(self, attr):
+        return getattr(self._load(), attr)
+
+    def __setattr__(self, attr, value):
+        setattr(self._load(), attr, value)
+
+    def __dir__(self):
+        return dir(self._load())
+
+    def __repr__(self):
+        state = "loaded" if self._name in sys.modules else "not loaded"
+        return "<lazy module '{}' ({})>".format(self._name, state)
+
+
+def lazy_import(name):
+    """
+    Module name, imported the first time it is used
+
+    Parameters
+    ----------
+    name: str
+        absolute module name, e.g. "matplotlib.pyplot"
+
+    Returns
+    -------
+    the module itself when it was already imported, else a LazyModule
+    """
+    if name in sys.modules:
+        return sys.modules[name]
+    return LazyModule(name)
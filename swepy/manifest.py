@@ -0,0 +1,170 @@
+import hashlib
+import os
+import sqlite3
+import threading
+
+
+def file_checksum(path, block_size=1024 * 1024):
+    """
+    sha256 hex digest of a file, read in blocks
+
+    Parameters
+    ----------
+    path: str
+        file to hash
+    block_size: int
+        bytes read per block
+    """
+    sha = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            sha.update(block)
+    return sha.hexdigest()
+
+
+class Manifest:
+    """
+    Persistent record of every file SWEpy resolves, downloads and processes.
+
+    Backed by a single SQLite table keyed on file name, so looking up a
+    file is a primary key hit no matter how long the record is. Status
+    moves through "downloaded" -> "subset" -> "concatenated" ("failed"
+    when a download gives up) and "path" always points at the file that
+    currently holds the data for that day/channel. "bounds" holds the
+    subset bounds of the files that were subset, so work done for another
+    study area is never mistaken for finished.
+    """
+
+    columns = [
+        "filename",
+        "url",
+        "date",
+        "channel",
+        "platform",
+        "sensor",
+        "size",
+        "checksum",
+        "status",
+        "path",
+        "bounds",
+    ]
+
+    def __init__(self, path):
+        """
+        Parameters
+        ----------
+        path: str
+            sqlite database file, created if it does not exist, or
+            ":memory:" for a record that only lasts until it is closed
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        self.conn = None
+        with self._lock:
+            self._connect()
+
+    def _connect(self):
+        """
+        Open the database (again, after close) and make sure the table has
+        every column; call with self._lock held
+        """
+        if self.conn is None:
+            self.conn = sqlite3.connect(self.path, check_same_thread=False)
+            with self.conn:
+                self.conn.execute("PRAGMA journal_mode=WAL")
+                self.conn.execute(
+                    "CREATE TABLE IF NOT EXISTS files "
+                    "(filename TEXT PRIMARY KEY, url TEXT, date TEXT, "
+                    "channel TEXT, platform TEXT, sensor TEXT, "
+                    "size INTEGER, checksum TEXT, status TEXT, path TEXT, "
+                    "bounds TEXT)"
+                )
+                existing = [
+                    row[1]
+                    for row in self.conn.execute("PRAGMA table_info(files)")
+                ]
+                if "bounds" not in existing:
+                    # written by an older version of SWEpy
+                    self.conn.execute(
+                        "ALTER TABLE files ADD COLUMN bounds TEXT"
+                    )
+        return self.conn
+
+    def get(self, filename):
+        """
+        Look up a single file
+
+        Returns
+        -------
+        entry: dict or None
+            {column: value} for the file, None if it was never recorded
+        """
+        with self._lock:
+            row = (
+                self._connect()
+                .execute("SELECT * FROM files WHERE filename = ?", (filename,))
+                .fetchone()
+            )
+        return None if row is None else dict(zip(self.columns, row))
+
+    def record(self, filename, **fields):
+        """
+        Insert or update the entry for filename
+
+        Parameters
+        ----------
+        filename: str
+            file name (no directory) the entry is keyed on
+        fields: dict
+            column values to set, see Manifest.columns
+        """
+        for key in fields:
+            if key not in self.columns:
+                raise KeyError("Unknown manifest column: {}".format(key))
+        with self._lock, self._connect() as conn:
+            conn.execute(
+                "INSERT OR IGNORE INTO files (filename) VALUES (?)",
+                (filename,),
+            )
+            if fields:
+                conn.execute(
+                    "UPDATE files SET {} WHERE filename = ?".format(
+                        ", ".join("{} = ?".format(key) for key in fields)
+                    ),
+                    list(fields.values()) + [filename],
+                )
+
+    def missing(self, filenames):
+        """
+        Files that still need to be downloaded
+
+        Parameters
+        ----------
+        filenames: list
+            file names to check
+
+        Returns
+        -------
+        list of the filenames whose data is not on disk according to the
+        manifest, in the order given
+        """
+        missing = []
+        for filename in filenames:
+            entry = self.get(filename)
+            if (
+                entry is None
+                or entry["status"] == "failed"
+                or not os.path.exists(entry["path"] or "")
+            ):
+                missing.append(filename)
+        return missing
+
+    def close(self):
+        """
+        Close the database connection, the next lookup or record opens it
+        again
+        """
+        with self._lock:
+            if self.conn is not None:
+                self.conn.close()
+                self.conn = None
@@ -1,10 +1,18 @@
 import os
-import requests
+import random
+import shutil
+import threading
+import time
 from datetime import datetime
 from functools import partial
 from string import Formatter
 
-import pandas as pd
+from swepy.lazy import lazy_import
+from swepy.manifest import file_checksum
+
+# only needed once something is downloaded
+requests = lazy_import("requests")
+urllib3 = lazy_import("urllib3")
 
 
 class nsidcDownloader:
@@ -29,8 +37,26 @@ class nsidcDownloader:
         "dataversion": "v1.3",
     }
 
+    # transient server errors worth another attempt
+    retry_statuses = [429, 500, 502, 503, 504]
+
+    # bounds for the adaptive streaming buffer (bytes)
+    min_chunk_size = 1024 * 1024
+    max_chunk_size = 8 * 1024 * 1024
+
     def __init__(
-        self, username=None, password=None, folder=".", no_auth=False, **kwargs
+        self,
+        username=None,
+        password=None,
+        folder=".",
+        no_auth=False,
+        retries=3,
+        backoff=1.0,
+        max_backoff=60.0,
+        timeout=(30, 300),
+        chunk_size=None,
+        manifest=None,
+        **kwargs
     ):
         """
         Snow Water Equivalence downloader.
@@ -41,6 +67,19 @@ class nsidcDownloader:
             NASA Earthdata username
         password: str
             NASA Earthdata password
+        retries: int
+            extra attempts for a download that fails with a transient error
+        backoff: float
+            base delay in seconds between attempts, doubled every retry
+        max_backoff: float
+            upper bound on the delay between attempts
+        timeout: (float, float)
+            connect and read timeouts in seconds for every request
+        chunk_size: int
+            streaming buffer in bytes, None picks one from the file size
+        manifest: swepy.manifest.Manifest
+            (Optional) record of downloaded files, files it lists as
+            downloaded are skipped without asking the server
         kwargs: dict
             keys to use as default in url_template
         """
@@ -61,12 +100,26 @@ class nsidcDownloader:
 
         # Tet up session
         self.session = requests.session()
+        self._session_owner = threading.get_ident()
+        self._local = threading.local()
         if no_auth is False:
             self.get_auth()
 
         # Output
         self.folder = folder
 
+        # Retry policy
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.timeout = timeout
+
+        # Streaming buffer and per file throughput log
+        self.chunk_size = chunk_size
+        self.transfers = []
+
+        self.manifest = manifest
+
     def set_defaults(self, **kwargs):
         """
         Set defaults for url template
@@ -120,9 +173,110 @@ class nsidcDownloader:
             if req.status_code == 401:
                 raise PermissionError("Bad NASA Earthdata Authentication!")
 
-    def download_file(self, folder=None, overwrite=False, **kwargs):
+    def get_session(self):
+        """
+        Get the requests session for the calling thread
+
+        requests.Session is not thread safe, so every worker thread gets its
+        own session seeded with the auth and cookies of the authenticated
+        session. The thread that logged in keeps using the original session.
+        """
+
+        if threading.get_ident() == self._session_owner:
+            return self.session
+        session = getattr(self._local, "session", None)
+        if session is None:
+            session = requests.session()
+            session.auth = self.session.auth
+            session.cookies.update(self.session.cookies)
+            self._local.session = session
+        return session
+
+    def remote_size(self, url):
+        """
+        Ask the server for the size of a file without downloading it
+
+        Parameters
+        ----------
+        url: str
+            url of the file
+
+        Returns
+        -------
+        size: int or None
+            Content-Length of the file, None if the server does not say
+        """
+
+        with self.get_session().head(
+            url, allow_redirects=True, timeout=self.timeout
+        ) as r:
+            if not r.ok or "Content-Length" not in r.headers:
+                return None
+            return int(r.headers["Content-Length"])
+
+    def get_chunk_size(self, length=None):
+        """
+        Size of the buffer used to stream a file to disk
+
+        A fixed self.chunk_size wins, otherwise aim for ~16 reads per file
+        within [min_chunk_size, max_chunk_size] so big files don't spend
+        their time in Python-level read/write calls.
+
+        Parameters
+        ----------
+        length: int
+            number of bytes about to be streamed, if known
+        """
+
+        if self.chunk_size:
+            return self.chunk_size
+        if length is None:
+            return self.min_chunk_size
+        return min(max(length // 16, self.min_chunk_size), self.max_chunk_size)
+
+    def backoff_delay(self, attempt):
+        """
+        Seconds to wait before retry number attempt (starting at 0)
+
+        Exponential backoff with full jitter: a random delay between zero
+        and backoff * 2 ** attempt, capped at max_backoff, so concurrent
+        workers hitting the same error don't retry in lockstep.
+        """
+
+        return random.uniform(
+            0, min(self.max_backoff, self.backoff * 2 ** attempt)
+        )
+
+    def download_file(
+        self, folder=None, overwrite=False, verify=True, **kwargs
+    ):
         """
         Download a file of particular kwargs
+
+        Data is streamed into "<filename>.part" and only renamed to the final
+        filename once its size matches what the server announced, so an
+        interrupted download never looks complete. A leftover .part file is
+        resumed with an HTTP Range request.
+
+        Connection errors, timeouts and the statuses in retry_statuses are
+        retried up to self.retries times with backoff_delay between
+        attempts, resuming from the partial file. Missing files (404) and
+        bad credentials (401/403) fail straight away.
+
+        With a manifest attached, files it lists as downloaded are skipped
+        without a request, and every outcome is written back to it.
+
+        Parameters
+        ----------
+        folder: str
+            directory to save the file in, defaults to self.folder
+        overwrite: bool
+            download the file again even if it already exists
+        verify: bool
+            compare the size of an existing file with the server before
+            skipping it, truncated files are resumed
+        kwargs: dict
+            keys to fill in url_template
         """
 
         url = self.format_url(**kwargs)
@@ -133,36 +287,160 @@ class nsidcDownloader:
         if not folder:
             folder = self.folder.format(all_keywords)
 
+        # Create dest folder if not exist
+        if not os.path.exists(folder):
+            os.makedirs(folder)
+
+        if self.manifest is None:
+            return self._retry_fetch(url, folder, overwrite, verify)
+
+        filename = url.split("/")[-1]
+        filepath = "{}/{}".format(folder, filename)
+        entry = self.manifest.get(filename)
+        if (
+            not overwrite
+            and entry is not None
+            and entry["status"] == "downloaded"
+            and os.path.exists(filepath)
+        ):
+            # verified by an earlier run, don't touch it
+            return [filename, True]
+        info = {
+            "url": url,
+            "date": "{:%Y-%m-%d}".format(kwargs["date1"]),
+            "channel": kwargs.get("channel"),
+            "platform": kwargs.get("platform"),
+            "sensor": kwargs.get("sensor"),
+        }
+        try:
+            result = self._retry_fetch(url, folder, overwrite, verify)
+        except Exception:
+            self.manifest.record(filename, status="failed", **info)
+            raise
+        self.manifest.record(
+            filename,
+            size=os.path.getsize(filepath),
+            checksum=file_checksum(filepath),
+            status="downloaded",
+            path=os.path.abspath(filepath),
+            **info
+        )
+        return result
+
+    def _retry_fetch(self, url, folder, overwrite, verify):
+        """
+        Call _fetch until it succeeds, following the retry policy
+        """
+
+        for attempt in range(self.retries + 1):
+            try:
+                # only wipe existing data on the first attempt, later
+                # attempts resume what the failed ones left behind
+                return self._fetch(
+                    url, folder, overwrite and attempt == 0, verify
+                )
+            except (
+                requests.ConnectionError,
+                requests.Timeout,
+                requests.exceptions.ChunkedEncodingError,
+            ) as e:
+                error = e
+            except requests.HTTPError as e:
+                if e.response.status_code not in self.retry_statuses:
+                    raise
+                error = e
+            if attempt < self.retries:
+                time.sleep(self.backoff_delay(attempt))
+        raise error
+
+    def _fetch(self, url, folder, overwrite, verify):
+        """
+        Single download attempt for download_file
+        """
+
         # Prepare file system
         filename = url.split("/")[-1]
         filepath = "{}/{}".format(folder, filename)
-        block_size = 1024
-        # print("{}".format(filename))
+        partpath = filepath + ".part"
 
+        if overwrite and os.path.exists(partpath):
+            os.remove(partpath)
         if os.path.exists(filepath):
             if overwrite:
                 os.remove(filepath)
+            elif verify and self.remote_size(url) not in [
+                None,
+                os.path.getsize(filepath),
+            ]:
+                # truncated by an older run, pick up where it stopped
+                os.replace(filepath, partpath)
             else:
                 print(" ** (skipping...) **")
                 print(filename)
                 return [filename, True]
 
+        offset = os.path.getsize(partpath) if os.path.exists(partpath) else 0
+        headers = {"Range": "bytes={}-".format(offset)} if offset else {}
+
         # Download the dang thing
-        with self.session.get(url, stream=True) as r:
+        with self.get_session().get(
+            url, stream=True, headers=headers, timeout=self.timeout
+        ) as r:
             if r.status_code == 404:
                 raise FileNotFoundError("File Not Found: {}".format(url))
-            resp = r.ok
+            if r.status_code in [401, 403]:
+                raise PermissionError("Bad NASA Earthdata Authentication!")
+            if r.status_code == 416:
+                # nothing left past offset, part file is complete or garbage
+                total = r.headers.get("Content-Range", "").split("/")[-1]
+                if total.isdigit() and int(total) == offset:
+                    os.replace(partpath, filepath)
+                    return [filename, True]
+                os.remove(partpath)
+                return self._fetch(url, folder, overwrite, verify)
+            r.raise_for_status()
+            if r.status_code != 206:
+                # server ignored the Range header, start from scratch
+                offset = 0
+            expected = r.headers.get("Content-Length")
+            if "Content-Encoding" in r.headers or expected is None:
+                expected = None  # size on disk won't match, can't check
+            else:
+                expected = offset + int(expected)
+            block_size = self.get_chunk_size(
+                None if expected is None else expected - offset
+            )
+            start = time.time()
             # Open file
-            with open(filepath, "wb") as f:
+            with open(partpath, "ab" if offset else "wb") as f:
+                # Stream raw socket data to file in big blocks
+                r.raw.decode_content = True
+                try:
+                    shutil.copyfileobj(r.raw, f, block_size)
+                except (
+                    urllib3.exceptions.ProtocolError,
+                    urllib3.exceptions.ReadTimeoutError,
+                ) as e:
+                    raise requests.ConnectionError(e)
+            seconds = time.time() - start
 
-                # Create dest folder if not exist
-                if not os.path.exists(folder):
-                    os.makedirs(folder)
-
-                # Stream content to file in chunks
-                for chunk in r.iter_content(block_size):
-                    f.write(chunk)
+        size = os.path.getsize(partpath)
+        self.transfers.append(
+            {
+                "file": filename,
+                "bytes": size - offset,
+                "seconds": seconds,
+                "MBps": (size - offset) / 1e6 / max(seconds, 1e-6),
+            }
+        )
+        if expected is not None and size != expected:
+            raise requests.ConnectionError(
+                "Incomplete download of {}: {} of {} bytes".format(
+                    filename, size, expected
+                )
+            )
+        os.replace(partpath, filepath)
         return [
             filename,
-            resp,
+            True,
         ]  # changed to filename from filepath to fix another script
@@ -0,0 +1,193 @@
+import mmap
+import os
+import tempfile
+import numpy as np
+import numpy.ma as ma
+from multiprocessing import Pool, cpu_count
+
+
+def share(cube, folder=None):
+    """
+    Expose a cube to worker processes as a memory mapped file
+
+    A cube that already is a file backed np.memmap is used as is, anything
+    else is written once to a temporary file. Masked values are stored as
+    nan (which makes integer masked cubes float64), the way the pandas
+    based filters treat them.
+
+    Parameters
+    ----------
+    cube: np.array
+        cube to share
+    folder: str
+        (Optional) directory for the temporary file, defaults to the system
+        temporary directory
+
+    Returns
+    -------
+    (path, shape, dtype, offset, temporary)
+        description of the mapping to pass on to open_shared, temporary is
+        True when the file has to be removed after use
+    """
+    if isinstance(cube, np.memmap) and isinstance(cube.base, mmap.mmap):
+        # the mapping itself, not a view into part of it
+        return cube.filename, cube.shape, cube.dtype.str, cube.offset, False
+    if ma.isMaskedArray(cube):
+        cube = ma.filled(ma.asarray(cube, dtype=np.float64), np.nan)
+    cube = np.asarray(cube)
+    shared = allocate(cube.shape, cube.dtype, folder)
+    out = open_shared(shared, "r+")
+    out[...] = cube
+    out.flush()
+    return shared
+
+
+def allocate(shape, dtype, folder=None):
+    """
+    Create a temporary file backed cube for workers to write into
+
+    Parameters
+    ----------
+    shape: tuple
+        shape of the cube
+    dtype: np.dtype
+        dtype of the cube
+    folder: str
+        (Optional) directory for the temporary file
+
+    Returns
+    -------
+    description of the mapping, see share
+    """
+    fd, path = tempfile.mkstemp(suffix=".dat", dir=folder)
+    os.close(fd)
+    dtype = np.dtype(dtype)
+    np.memmap(path, dtype=dtype, mode="w+", shape=shape).flush()
+    return path, tuple(shape), dtype.str, 0, True
+
+
+def open_shared(shared, mode="r"):
+    """
+    Map a cube described by share
+
+    Parameters
+    ----------
+    shared: tuple
+        description returned by share
+    mode: str
+        np.memmap mode, "r" to read, "c" for copy on write or "r+" to
+        write in place
+    """
+    path, shape, dtype, offset = shared[:4]
+    return np.memmap(path, dtype=dtype, mode=mode, shape=shape, offset=offset)
+
+
+def release(shared):
+    """
+    Remove the temporary file behind a shared cube
+
+    Open mappings stay valid on POSIX systems, where removing the file only
+    frees the space once they are closed. Where the file can't be removed
+    while mapped it is left in the temporary directory.
+    """
+    if shared[4]:
+        try:
+            os.remove(shared[0])
+        except OSError:
+            pass
+
+
+def _block_job(args):
+    """
+    Apply func to one block of a shared cube, writing into the shared
+    output when there is one
+    """
+    func, shared, out, index = args
+    # copy on write, so func may modify its block without touching the file
+    result = func(np.asarray(open_shared(shared, "c")[index]))
+    if out is None:
+        return result
+    block = open_shared(out, "r+")
+    block[index] = result
+    block.flush()
+    return None
+
+
+def map_blocks(
+    func,
+    cube,
+    axis=2,
+    dtype=None,
+    workers=None,
+    folder=None,
+    block=None,
+    out=None,
+):
+    """
+    Apply func to blocks of a cube on a process pool, without pickling the
+    cube to the workers or the results back
+
+    The cube is split along axis and every worker maps only its block of
+    the shared file. With a dtype, func has to return a block of the same
+    shape, which the worker writes straight into a preallocated output of
+    that dtype. Without one, the (small) results of func are returned.
+
+    Parameters
+    ----------
+    func: callable
+        picklable function of a block, module level or functools.partial
+    cube: np.array
+        cube to process, see share for how it is exposed to the workers
+    axis: int
+        axis to split the cube on
+    dtype: np.dtype
+        (Optional) dtype of the output cube
+    workers: int
+        (Optional) number of processes, defaults to every core
+    folder: str
+        (Optional) directory for the temporary files
+    block: int
+        (Optional) largest block along axis, to bound the memory each
+        worker needs; defaults to one block per worker
+    out: str
+        (Optional) .npy file to keep the output cube in, instead of a
+        temporary file
+
+    Returns
+    -------
+    the output cube (np.memmap) when dtype is given, else the list of
+    results of func in block order
+    """
+    if workers is None:
+        workers = cpu_count()
+    length = np.shape(cube)[axis]
+    if block is None:
+        parts = min(workers, length)
+    else:
+        parts = -(-length // block)
+    bounds = np.linspace(0, length, parts + 1).astype(int)
+    shared = share(cube, folder)
+    if dtype is None:
+        output = None
+    elif out is None:
+        output = allocate(np.shape(cube), dtype, folder)
+    else:
+        np.lib.format.open_memmap(
+            out, mode="w+", dtype=dtype, shape=np.shape(cube)
+        ).flush()
+        output = share(np.lib.format.open_memmap(out, mode="r+"))
+    try:
+        jobs = []
+        for start, stop in zip(bounds[:-1], bounds[1:]):
+            index = [slice(None)] * len(np.shape(cube))
+            index[axis] = slice(start, stop)
+            jobs.append((func, shared, output, tuple(index)))
+        with Pool(min(workers, len(jobs))) as p:
+            results = p.map(_block_job, jobs, chunksize=1)
+    finally:
+        release(shared)
+    if output is None:
+        return results
+    result = open_shared(output, "r+")
+    release(output)
+    return result
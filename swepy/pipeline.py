@@ -1,21 +1,505 @@
 # author: Will Norris --> wino6687@colorado.edu, Earth Lab, CU Boulder
 from datetime import datetime, timedelta
 import swepy.nsidcDownloader as nsidcDownloader
-import swepy.easeReproject as easeReproject
+import swepy.manifest as manifest
+from swepy.lazy import lazy_import
 import numpy as np
-from netCDF4 import Dataset
-import pandas as pd
-from nco import Nco
 import os
-from tqdm import tqdm
+from concurrent.futures import Future, ThreadPoolExecutor
+from itertools import groupby, zip_longest
+from multiprocessing import Pool
 import glob
-import xarray
-import fsspec
+import re
+import shutil
+import threading
 import numpy.ma as ma
-import zarr
 
+# heavy or seldom needed, imported on first use
+easeReproject = lazy_import("swepy.easeReproject")
+latlon = lazy_import("swepy.latlon")
+netCDF4 = lazy_import("netCDF4")
+pd = lazy_import("pandas")
+xarray = lazy_import("xarray")
+tqdm = lazy_import("tqdm")
+zarr = lazy_import("zarr")
 
-nco = Nco()
+_nco = None
+
+
+def get_nco():
+    """
+    Shared Nco instance, created on first use
+
+    Nco() looks for the NCO binaries on the PATH, which is only worth doing
+    when an nco engine is actually used.
+    """
+    global _nco
+    if _nco is None:
+        from nco import Nco
+
+        _nco = Nco()
+    return _nco
+
+
+# index windows already worked out, keyed on grid layout and bounds
+_windows = {}
+
+
+def subset_window(x, y, geo_list):
+    """
+    Index window of the pixels inside geo_list, matching what
+    ``ncks -d x,... -d y,...`` selects
+
+    Only the first coordinate and the length of each axis are read to look
+    the window up, the full coordinate arrays are read once per grid.
+
+    Parameters
+    ----------
+    x: netCDF4.Variable or np.array
+        x coordinates (map meters) of the file
+    y: netCDF4.Variable or np.array
+        y coordinates (map meters) of the file
+    geo_list: [float, float, float, float]
+        [x_ul, y_ul, x_lr, y_lr] map coordinates from Swepy.get_xy
+
+    Returns
+    -------
+    (xslice, yslice): (slice, slice)
+        index ranges to read along x and y
+    """
+    key = (len(x), float(x[0]), len(y), float(y[0]), tuple(geo_list))
+    if key not in _windows:
+        xmin, xmax = sorted([geo_list[0], geo_list[2]])
+        ymin, ymax = sorted([geo_list[1], geo_list[3]])
+        x = np.asarray(x[:])
+        y = np.asarray(y[:])
+        xi = np.where((x >= xmin) & (x <= xmax))[0]
+        yi = np.where((y >= ymin) & (y <= ymax))[0]
+        if len(xi) == 0 or len(yi) == 0:
+            raise ValueError("Bounding coordinates don't overlap the file")
+        _windows[key] = (
+            slice(xi[0], xi[-1] + 1),
+            slice(yi[0], yi[-1] + 1),
+        )
+    return _windows[key]
+
+
+def read_subset(infile, geo_list):
+    """
+    Read only the TB pixels inside geo_list from a file into memory
+
+    Parameters
+    ----------
+    infile: str
+        netCDF file to read
+    geo_list: [float, float, float, float]
+        [x_ul, y_ul, x_lr, y_lr] map coordinates from Swepy.get_xy
+
+    Returns
+    -------
+    tb: np.ma.MaskedArray
+        (time, y, x) TB values inside the bounds
+    """
+    with netCDF4.Dataset(infile, "r") as src:
+        xs, ys = subset_window(src["x"], src["y"], geo_list)
+        return src["TB"][:, ys, xs]
+
+
+def subset_netcdf(infile, outfile, geo_list):
+    """
+    Subset a tB file in process with netCDF4, the equivalent of
+    ``ncks -d x,... -d y,... -v TB``
+
+    Only the TB hyperslab inside the bounds is read, and TB is written out
+    with its coordinate and grid mapping variables, attributes and
+    compression settings. Values are copied packed, without scaling.
+
+    Parameters
+    ----------
+    infile: str
+        file to subset
+    outfile: str
+        name of the subsetted file to write
+    geo_list: [float, float, float, float]
+        [x_ul, y_ul, x_lr, y_lr] map coordinates from Swepy.get_xy
+    """
+    with netCDF4.Dataset(infile, "r") as src, netCDF4.Dataset(
+        outfile, "w"
+    ) as dst:
+        xs, ys = subset_window(src["x"], src["y"], geo_list)
+        window = {"x": xs, "y": ys}
+        tb = src["TB"]
+        names = list(tb.dimensions) + ["TB"]
+        if "grid_mapping" in tb.ncattrs():
+            names.insert(0, tb.grid_mapping)
+        dst.setncatts(src.__dict__)
+        for name, dimension in src.dimensions.items():
+            size = len(dimension)
+            if name in window:
+                size = window[name].stop - window[name].start
+            dst.createDimension(
+                name, None if dimension.isunlimited() else size
+            )
+        for name in names:
+            if name not in src.variables:
+                continue
+            var = src[name]
+            var.set_auto_maskandscale(False)
+            attrs = var.__dict__
+            filters = var.filters() or {}
+            out = dst.createVariable(
+                name,
+                var.datatype,
+                var.dimensions,
+                zlib=filters.get("zlib", False),
+                complevel=filters.get("complevel", 4),
+                shuffle=filters.get("shuffle", False),
+                fill_value=attrs.get("_FillValue"),
+            )
+            out.setncatts(
+                {k: v for k, v in attrs.items() if k != "_FillValue"}
+            )
+            out.set_auto_maskandscale(False)
+            index = tuple(window.get(d, slice(None)) for d in var.dimensions)
+            out[...] = var[index]
+    return outfile
+
+
+def subset_file(infile, outfile, geo_list, engine="nco"):
+    """
+    Subset one file with the chosen engine
+
+    Parameters
+    ----------
+    infile: str
+        file to subset
+    outfile: str
+        name of the subsetted file to write
+    geo_list: [float, float, float, float]
+        [x_ul, y_ul, x_lr, y_lr] map coordinates from Swepy.get_xy
+    engine: str
+        "nco" to shell out to ncks, "netcdf" to subset in process
+    """
+    if engine == "netcdf":
+        return subset_netcdf(infile, outfile, geo_list)
+    elif engine == "nco":
+        opt = [
+            "-d x,%f,%f" % (geo_list[0], geo_list[2]),
+            "-d y,%f,%f" % (geo_list[3], geo_list[1]),
+            "-v TB",
+        ]
+        get_nco().ncks(input=infile, output=outfile, options=opt)
+        return outfile
+    else:
+        raise ValueError("Unknown subset engine: {}".format(engine))
+
+
+def append_netcdf(outfile, infile):
+    """
+    Append the time steps of infile to outfile along the unlimited time
+    dimension, without rewriting what outfile already holds
+
+    outfile is created as a copy of infile if it doesn't exist yet.
+
+    Parameters
+    ----------
+    outfile: str
+        file to grow
+    infile: str
+        file with the same grid/subset as outfile to append
+    """
+    if not os.path.exists(outfile):
+        shutil.copyfile(infile, outfile)
+        return outfile
+    with netCDF4.Dataset(infile, "r") as src, netCDF4.Dataset(
+        outfile, "a"
+    ) as dst:
+        start = len(dst.dimensions["time"])
+        stop = start + len(src.dimensions["time"])
+        for name, var in src.variables.items():
+            if var.dimensions[:1] != ("time",) or name not in dst.variables:
+                continue
+            var.set_auto_maskandscale(False)
+            dst[name].set_auto_maskandscale(False)
+            dst[name][start:stop] = var[:]
+    return outfile
+
+
+def _read_job(infile):
+    """
+    Read the packed time varying variables of one file, for concat_netcdf
+    """
+    with netCDF4.Dataset(infile, "r") as src:
+        src.set_auto_maskandscale(False)
+        return {
+            name: var[:]
+            for name, var in src.variables.items()
+            if var.dimensions[:1] == ("time",)
+        }
+
+
+def concat_netcdf(infiles, outfile, workers=1):
+    """
+    Concatenate files along time in one pass, the equivalent of
+    ``ncrcat -O``
+
+    The output is laid out from the first file and its time axis is sized
+    from the file headers up front, so every input lands in its own time
+    slice. Inputs are read by a process pool and written by this process,
+    each byte is written once and nothing is staged in temporary files.
+
+    Parameters
+    ----------
+    infiles: List(str)
+        files with the same grid/subset, in time order
+    outfile: str
+        file to write, replaced if it exists
+    workers: int
+        number of reader processes
+
+    Returns
+    -------
+    outfile
+    """
+    starts = [0]
+    for infile in infiles:
+        with netCDF4.Dataset(infile, "r") as src:
+            starts.append(starts[-1] + len(src.dimensions["time"]))
+    with netCDF4.Dataset(infiles[0], "r") as src, netCDF4.Dataset(
+        outfile, "w"
+    ) as dst:
+        dst.setncatts(src.__dict__)
+        for name, dimension in src.dimensions.items():
+            dst.createDimension(
+                name, None if dimension.isunlimited() else len(dimension)
+            )
+        for name, var in src.variables.items():
+            var.set_auto_maskandscale(False)
+            attrs = var.__dict__
+            filters = var.filters() or {}
+            chunks = var.chunking()
+            out = dst.createVariable(
+                name,
+                var.datatype,
+                var.dimensions,
+                zlib=filters.get("zlib", False),
+                complevel=filters.get("complevel", 4),
+                shuffle=filters.get("shuffle", False),
+                chunksizes=None if chunks == "contiguous" else chunks,
+                fill_value=attrs.get("_FillValue"),
+            )
+            out.setncatts(
+                {k: v for k, v in attrs.items() if k != "_FillValue"}
+            )
+            out.set_auto_maskandscale(False)
+            if var.dimensions[:1] != ("time",):
+                out[...] = var[...]
+        if workers > 1:
+            pool = Pool(workers)
+            reads = pool.imap(_read_job, infiles)
+        else:
+            pool = None
+            reads = map(_read_job, infiles)
+        try:
+            for i, values in enumerate(reads):
+                for name, value in values.items():
+                    dst[name][starts[i] : starts[i + 1]] = value
+        finally:
+            if pool is not None:
+                pool.close()
+                pool.join()
+    return outfile
+
+
+def last_time(file):
+    """
+    Date of the last time step in a SWEpy output
+
+    Parameters
+    ----------
+    file: str
+        netCDF file with a CF time variable
+
+    Returns
+    -------
+    datetime of the last time step, None if the file doesn't exist or is
+    empty
+    """
+    if not os.path.exists(file):
+        return None
+    with netCDF4.Dataset(file, "r") as f:
+        time = f["time"]
+        if len(time) == 0:
+            return None
+        return netCDF4.num2date(
+            time[-1],
+            time.units,
+            getattr(time, "calendar", "standard"),
+            only_use_cftime_datetimes=False,
+            only_use_python_datetimes=True,
+        )
+
+
+class ZarrWriter:
+    """
+    Write daily netCDF files straight into a preallocated Zarr store
+
+    The store is laid out the way xarray expects (``_ARRAY_DIMENSIONS``
+    attributes, consolidated metadata), holds every date it was created
+    for and keeps the raw packed values and CF attributes of the source
+    files, so ``xarray.open_zarr`` decodes it like the concatenated netCDF.
+    Days are buffered until their time chunk is complete and each chunk is
+    written once, so files have to be written in date order.
+    """
+
+    chunk_bytes = 16 * 1024 * 1024
+
+    def __init__(self, store, dates, time_chunk=None):
+        """
+        Parameters
+        ----------
+        store: str
+            directory of the zarr store, replaced if it exists
+        dates: List(datetime*)
+            every date the store will hold, days never written stay at the
+            fill value
+        time_chunk: int
+            (Optional) days per chunk, defaults to chunks of about
+            chunk_bytes capped at 32 days
+        """
+        self.store = store
+        self.dates = pd.DatetimeIndex(dates)
+        self.time_chunk = time_chunk
+        self.group = None
+        self._chunk = None
+        self._buffers = {}
+
+    def _create(self, src):
+        """
+        Lay out the store using the variables of the first file written
+        """
+        self.group = zarr.open_group(self.store, mode="w")
+        self.group.attrs.update({k: src.getncattr(k) for k in src.ncattrs()})
+        compressor = zarr.Blosc(
+            cname="zstd", clevel=3, shuffle=zarr.Blosc.SHUFFLE
+        )
+        day = max(
+            src[name].dtype.itemsize * int(np.prod(src[name].shape[1:]))
+            for name, var in src.variables.items()
+            if var.dimensions[:1] == ("time",)
+        )
+        if self.time_chunk is None:
+            self.time_chunk = int(np.clip(self.chunk_bytes // day, 1, 32))
+        for name, var in src.variables.items():
+            attrs = {k: var.getncattr(k) for k in var.ncattrs()}
+            fill = attrs.pop("_FillValue", None)
+            attrs["_ARRAY_DIMENSIONS"] = list(var.dimensions)
+            if name == "time":
+                values = netCDF4.date2num(
+                    self.dates.to_pydatetime(),
+                    var.units,
+                    getattr(var, "calendar", "standard"),
+                )
+                arr = self.group.array(name, values, compressor=None)
+            elif var.dimensions[:1] == ("time",):
+                arr = self.group.full(
+                    name,
+                    fill_value=fill,
+                    shape=(len(self.dates),) + var.shape[1:],
+                    chunks=(self.time_chunk,) + var.shape[1:],
+                    dtype=var.dtype,
+                    compressor=compressor,
+                )
+            else:
+                var.set_auto_maskandscale(False)
+                arr = self.group.array(
+                    name, np.asarray(var[...]), fill_value=fill
+                )
+            arr.attrs.update(
+                {
+                    k: v.tolist() if isinstance(v, np.ndarray) else v
+                    for k, v in attrs.items()
+                }
+            )
+
+    def write(self, date, infile):
+        """
+        Write the time steps of infile into the slot for date
+
+        Parameters
+        ----------
+        date: datetime
+            day infile holds
+        infile: str
+            daily (subsetted) netCDF file
+        """
+        index = self.dates.get_loc(pd.Timestamp(date).normalize())
+        with netCDF4.Dataset(infile, "r") as src:
+            if self.group is None:
+                self._create(src)
+            chunk = index // self.time_chunk
+            if chunk != self._chunk:
+                self.flush()
+                self._chunk = chunk
+            for name, var in src.variables.items():
+                if name == "time" or var.dimensions[:1] != ("time",):
+                    continue
+                arr = self.group[name]
+                if name not in self._buffers:
+                    self._buffers[name] = np.full(
+                        (self.time_chunk,) + arr.shape[1:],
+                        arr.fill_value,
+                        dtype=arr.dtype,
+                    )
+                var.set_auto_maskandscale(False)
+                self._buffers[name][index % self.time_chunk] = var[0]
+
+    def flush(self):
+        """
+        Write the buffered chunk to the store
+        """
+        if self._chunk is not None:
+            start = self._chunk * self.time_chunk
+            stop = min(start + self.time_chunk, len(self.dates))
+            for name, buffer in self._buffers.items():
+                self.group[name][start:stop] = buffer[: stop - start]
+        self._chunk = None
+        self._buffers = {}
+
+    def close(self):
+        """
+        Flush the last chunk and consolidate the store metadata
+
+        Returns
+        -------
+        the zarr group, None if nothing was ever written
+        """
+        if self.group is None:
+            return None
+        self.flush()
+        zarr.consolidate_metadata(self.store)
+        return self.group
+
+
+def _subset_job(args):
+    """
+    Pool worker for Swepy.subset: subset one file, report instead of raise
+
+    Parameters
+    ----------
+    args: (infile, outfile, geo_list, engine)
+        arguments for subset_file
+
+    Returns
+    -------
+    error: str or None
+        description of what went wrong, None on success
+    """
+    try:
+        subset_file(*args)
+    except Exception as e:
+        return repr(e)
+    return None
 
 
 class Swepy:
@@ -31,6 +515,7 @@ class Swepy:
         outfile19="all_days_19H.nc",
         outfile37="all_days_37H.nc",
         high_res=True,
+        resume=False,
     ):
         """
         Parameters
@@ -47,6 +532,11 @@ class Swepy:
             name of final output file, 37 GHz
         high_res: bool
             True: scrape high resolution files, False: low resolution
+        resume: bool
+            keep the manifest in working_dir/data/manifest.db, so a rerun
+            skips files an earlier run already downloaded, subset (with the
+            same bounds) or concatenated. Otherwise it only lasts as long
+            as this object.
         """
 
         # set whether we are scraping resampled data or not
@@ -70,6 +560,10 @@ class Swepy:
         self.wget, self.path19, self.path37 = self.get_directories(
             self.working_dir
         )
+        # record of every file resolved, lets reruns skip finished work
+        self.manifest = manifest.Manifest(
+            self.working_dir + "/data/manifest.db" if resume else ":memory:"
+        )
 
         self.outfile_19 = outfile19
         self.outfile_37 = outfile37
@@ -89,6 +583,8 @@ class Swepy:
         self.concatlist = [None, None]
         self.concat19list = []
         self.concat37list = []
+        self.failed_downloads = []
+        self.failed_subsets = []
 
     def set_dates(self, start=None, end=None):
         """
@@ -188,15 +684,15 @@ class Swepy:
             lat1 > -50 and lat2 > -50
         ):  # mid lat
             self.grid = "T"
-            self.ease = easeReproject.EaseReproject("EASE2_T3.125km")
+            self.ease = easeReproject.EaseReproject.for_grid("EASE2_T3.125km")
         elif (lat1 > 40 and lat2 > 40) and (lat1 < 90 and lat2 < 90):  # north
             self.grid = "N"
-            self.ease = easeReproject.EaseReproject("EASE2_N3.125km")
+            self.ease = easeReproject.EaseReproject.for_grid("EASE2_N3.125km")
         elif (lat1 < -40 and lat2 < -40) and (
             lat1 > -90 and lat2 > -90
         ):  # South
             self.grid = "S"
-            self.ease = easeReproject.EaseReproject("EASE2_S3.125km")
+            self.ease = easeReproject.EaseReproject.for_grid("EASE2_S3.125km")
         else:
             print(
                 "SWEpy currently only supports subsetting study areas with a study area in the North, South, or Equatorial imagery \
@@ -251,8 +747,42 @@ class Swepy:
         xlr, ylr = self.ease.grid_to_map(row, col)
         return [xul, yul, xlr, ylr]
 
+    def get_latlon(self, channel="19H", folder=None):
+        """
+        Latitude and longitude of every pixel of the files scraped for a
+        channel, sliced out of cached lookup tables (see swepy.latlon)
+
+        Parameters
+        ----------
+        channel: str
+            (Optional) 19H vs 37H channel, which sets the resolution
+        folder: str
+            (Optional) cache directory of the lookup tables
+
+        Returns
+        -------
+        (lats, lons)
+            read only arrays of shape (y, x), matching the subsetted TB
+        """
+        if self.grid is None:
+            print("Grid needs to be set by 'set_grid' first")
+            raise ValueError
+        if not self.high_res:
+            resolution = "25"
+        else:
+            resolution = "6.25" if channel in ["19H", "18H"] else "3.125"
+        gridname = "EASE2_{}{}km".format(self.grid, resolution)
+        geo_list = self.geo_list if self.subBool else None
+        return latlon.latlon_window(gridname, geo_list, folder)
+
     def subset(
-        self, scrape=False, in_dir=None, out_dir19=None, out_dir37=None
+        self,
+        scrape=False,
+        in_dir=None,
+        out_dir19=None,
+        out_dir37=None,
+        engine="nco",
+        workers=1,
     ):
         """
         Get the files from wget directory
@@ -276,43 +806,76 @@ class Swepy:
         out_dir37: str
             (Optional) directory to store output 37GHz files
             Default: "working_dir/data/Subsetted_37H"
+
+        engine: str
+            (Optional) "nco" runs ncks for every file, "netcdf" subsets
+            in process (no fork/exec, only the TB window is read)
+            Default: "nco"
+
+        workers: int
+            (Optional) number of processes to subset with, 19H and 37H
+            files are interleaved across the pool. Inputs are only deleted
+            once their subset was written; failures are listed in
+            self.failed_subsets, which is reset on every call.
+            Default: 1
         """
 
         os.chdir(self.working_dir + "/data")
+        self.failed_subsets = []
 
         if in_dir:
             os.chdir(in_dir)
-            self.down19list = glob.glob("*19H*")
-            self.down37list = glob.glob("*37H*")
+            self.down19list = glob.glob("*19H*.nc")
+            self.down37list = glob.glob("*37H*.nc")
             os.chdir("..")
 
-        for file in tqdm(self.down19list):
-            outfile = (
-                self.path19 + file if out_dir19 is None else out_dir19 + file
+        jobs = []
+        for file19, file37 in zip_longest(self.down19list, self.down37list):
+            # interleave channels so both finish together
+            if file19 is not None:
+                out_dir = self.path19 if out_dir19 is None else out_dir19
+                jobs.append(("19H", file19, out_dir + file19))
+            if file37 is not None:
+                out_dir = self.path37 if out_dir37 is None else out_dir37
+                jobs.append(("37H", file37, out_dir + file37))
+        args = [
+            (
+                self.wget + file if in_dir is None else in_dir + file,
+                outfile,
+                self.geo_list,
+                engine,
             )
-            infile = self.wget + file if in_dir is None else in_dir + file
-            opt = [
-                "-d x,%f,%f" % (self.geo_list[0], self.geo_list[2]),
-                "-d y,%f,%f" % (self.geo_list[3], self.geo_list[1]),
-                "-v TB",
-            ]
-            nco.ncks(input=infile, output=outfile, options=opt)
-            self.sub19list.append(outfile)
+            for channel, file, outfile in jobs
+        ]
+        if workers > 1:
+            with Pool(workers) as p:
+                results = p.imap(_subset_job, args)
+                results = list(tqdm.tqdm(results, total=len(args)))
+        else:
+            results = [_subset_job(arg) for arg in tqdm.tqdm(args)]
+
+        for (channel, file, outfile), (infile, *_), error in zip(
+            jobs, args, results
+        ):
+            if error is not None:
+                # keep the input so the file can be subset again
+                print("failing to subset {}: {}".format(file, error))
+                self.failed_subsets.append(infile)
+                continue
+            if channel == "19H":
+                self.sub19list.append(outfile)
+            else:
+                self.sub37list.append(outfile)
             os.remove(infile)
-
-        for file in tqdm(self.down37list):
-            outfile = (
-                self.path37 + file if out_dir37 is None else out_dir37 + file
+            self.manifest.record(
+                file,
+                status="subset",
+                path=os.path.abspath(outfile),
+                bounds=self.subset_bounds(),
             )
-            infile = self.wget + file if in_dir is None else in_dir + file
-            opt = [
-                "-d x,%f,%f" % (self.geo_list[0], self.geo_list[2]),
-                "-d y,%f,%f" % (self.geo_list[3], self.geo_list[1]),
-                "-v TB",
-            ]
-            nco.ncks(input=infile, output=outfile, options=opt)
-            self.sub37list.append(outfile)
-            os.remove(infile)
+        # files resumed from the manifest were queued ahead of new ones
+        self.sub19list.sort(key=self.file_day)
+        self.sub37list.sort(key=self.file_day)
         self.down19list = []
         self.down37list = []
         return
@@ -325,33 +888,467 @@ class Swepy:
         generate complete list of files to scrape, then divide into process pool
     '''
 
-    def scrape_all(self):  # rename to be related to 'full workflow'
+    def scrape_all(
+        self,
+        max_workers=1,
+        engine="nco",
+        workers=1,
+        stream=False,
+        to_zarr=False,
+    ):  # rename to 'full workflow'
         """
         Function to ensure we subset and concatenate every year!
         Implements the whole workflow!
+
+        With resume=True progress is kept in the manifest, so rerunning
+        after a crash skips batches that were already concatenated and files
+        that were already downloaded or subset. The manifest connection is
+        closed once the workflow is done.
+
+        Parameters
+        ----------
+        max_workers: int
+            number of concurrent downloads passed on to scrape
+        engine: str
+            subset and concatenation engine, "nco" or "netcdf". The netcdf
+            engine concatenates every day in one pass at the end, without
+            the temporary batch files.
+        workers: int
+            number of subset and concatenation reader processes
+        stream: bool
+            run download, subset and concatenation as overlapping stages,
+            see stream_all
+        to_zarr: bool
+            write zarr stores instead of netCDF files, see stream_zarr
         """
         # can't scrape all unless all parameters entered
         if self.check_params() is False:
             return None, None
-        if len(self.dates) <= 300:
-            self.scrape()
-            if self.subBool:
-                self.subset()
-            return self.concatenate()
-        else:
-            comp_list = [
-                self.dates[x : x + 300] for x in range(0, len(self.dates), 300)
-            ]
-            for count, subList in enumerate(comp_list):
-                name19 = "temp19_" + str(count) + ".nc"
-                name37 = "temp37_" + str(count) + ".nc"
-                self.scrape(subList)
+        try:
+            if to_zarr:
+                return self.stream_zarr(
+                    max_workers=max_workers, engine=engine, workers=workers
+                )
+            if stream:
+                return self.stream_all(
+                    max_workers=max_workers, engine=engine, workers=workers
+                )
+            if engine == "netcdf":
+                # subset files are small, keep them all and write the outputs
+                # once instead of through temporary batch files
+                failed, failed_subsets = [], []
+                for count in range(0, len(self.dates), 300):
+                    self.scrape(
+                        self.dates[count : count + 300],
+                        max_workers=max_workers,
+                    )
+                    failed.extend(self.failed_downloads)
+                    if self.subBool:
+                        self.subset(engine=engine, workers=workers)
+                        failed_subsets.extend(self.failed_subsets)
+                self.failed_downloads = failed
+                self.failed_subsets = failed_subsets
+                return self.concatenate(engine=engine, workers=workers)
+            if len(self.dates) <= 300:
+                self.scrape(max_workers=max_workers)
                 if self.subBool:
-                    self.subset()
-                self.concatenate(
-                    name19, name37, all=True
-                )  # CAN I PARALLELIZE HERE
-            return self.final_concat()
+                    self.subset(engine=engine, workers=workers)
+                return self.concatenate()
+            else:
+                comp_list = [
+                    self.dates[x : x + 300]
+                    for x in range(0, len(self.dates), 300)
+                ]
+                failed, failed_subsets = [], []
+                for count, subList in enumerate(comp_list):
+                    name19 = "temp19_" + str(count) + ".nc"
+                    name37 = "temp37_" + str(count) + ".nc"
+                    done = self.finished_batch(subList)
+                    if done is not None:
+                        # concatenated by an earlier run that didn't finish
+                        self.concat19list.append(done[0])
+                        self.concat37list.append(done[1])
+                        continue
+                    self.scrape(subList, max_workers=max_workers)
+                    failed.extend(self.failed_downloads)
+                    if self.subBool:
+                        self.subset(engine=engine, workers=workers)
+                        failed_subsets.extend(self.failed_subsets)
+                    self.concatenate(
+                        name19, name37, all=True
+                    )  # CAN I PARALLELIZE HERE
+                self.failed_downloads = failed
+                self.failed_subsets = failed_subsets
+                return self.final_concat()
+        finally:
+            self.close()
+
+    def stream_all(
+        self,
+        dates=None,
+        max_workers=4,
+        engine="nco",
+        workers=2,
+        max_pending=32,
+    ):
+        """
+        Pipelined version of scrape_all
+
+        Downloads run on a thread pool and each finished file is handed to
+        a process pool for subsetting, while this thread appends subsetted
+        files to the outputs in date order and deletes them. All three
+        stages overlap, so the workflow runs at the speed of its slowest
+        stage. At most max_pending files are downloaded but not yet
+        appended at any time; downloads wait for the appender past that.
+
+        Outputs are written to working_dir/data/ (outfile19/outfile37) and
+        replaced if they exist. Failed downloads and subsets are skipped and
+        listed in self.failed_downloads / self.failed_subsets.
+
+        Parameters
+        ----------
+        dates: List(datetime*)
+            (Optional) dates to process, defaults to the dates set
+        max_workers: int
+            number of concurrent downloads
+        engine: str
+            subset engine, "netcdf" or "nco"
+        workers: int
+            number of subset processes
+        max_pending: int
+            bound on files on disk waiting to be appended
+
+        Returns
+        -------
+        (outfile19, outfile37)
+            paths of the concatenated files
+        """
+        if self.check_params() is False:
+            return None, None
+        outfiles = {
+            "19H": os.path.join(self.working_dir, "data", self.outfile_19),
+            "37H": os.path.join(self.working_dir, "data", self.outfile_37),
+        }
+        for outfile in outfiles.values():
+            if os.path.exists(outfile):
+                os.remove(outfile)
+        if dates is None:
+            dates = self.dates
+        jobs = [
+            (date, channel) for date in dates for channel in ["19H", "37H"]
+        ]
+        try:
+            self._stream(
+                jobs, outfiles, max_workers, engine, workers, max_pending
+            )
+        finally:
+            self.close()
+        self.concatlist = [outfiles["19H"], outfiles["37H"]]
+        return outfiles["19H"], outfiles["37H"]
+
+    def stream_zarr(
+        self,
+        dates=None,
+        outname19="zarr19",
+        outname37="zarr37",
+        max_workers=4,
+        engine="nco",
+        workers=2,
+        max_pending=32,
+        time_chunk=None,
+    ):
+        """
+        Version of stream_all that writes straight into Zarr stores
+
+        Each subsetted day is written into its slot of a preallocated,
+        Blosc compressed store, so neither the concatenated netCDF files
+        nor the temporary batch files of scrape_all are ever written. The
+        stores hold every date, days that failed stay at the fill value and
+        are listed in self.failed_downloads / self.failed_subsets.
+
+        Parameters
+        ----------
+        dates: List(datetime*)
+            (Optional) dates to process, defaults to the dates set
+        outname19: str
+            (Optional) name of the 19H store in working_dir/data/
+        outname37: str
+            (Optional) name of the 37H store in working_dir/data/
+        max_workers, engine, workers, max_pending:
+            see stream_all
+        time_chunk: int
+            (Optional) days per zarr chunk, see ZarrWriter
+
+        Returns
+        -------
+        dict: {outname19:zarr_obj, outname37:zarr_obj}
+            dictionary with store name as key and the zarr group as value
+        """
+        if self.check_params() is False:
+            return None
+        if dates is None:
+            dates = self.dates
+        writers = {
+            channel: ZarrWriter(
+                os.path.join(self.working_dir, "data", name),
+                dates,
+                time_chunk,
+            )
+            for channel, name in [("19H", outname19), ("37H", outname37)]
+        }
+        jobs = [
+            (date, channel) for date in dates for channel in ["19H", "37H"]
+        ]
+        try:
+            self._stream(
+                jobs, writers, max_workers, engine, workers, max_pending
+            )
+        finally:
+            self.close()
+        self.zarr19 = writers["19H"].close()
+        self.zarr37 = writers["37H"].close()
+        return {outname19: self.zarr19, outname37: self.zarr37}
+
+    def update(
+        self, end=None, max_workers=4, engine="nco", workers=2,
+    ):
+        """
+        Bring existing outputs up to date
+
+        Reads the last day held in each of outfile19/outfile37 in
+        working_dir/data/ and downloads, subsets and appends only the days
+        after it, up to end. The existing cube is extended along its
+        unlimited time dimension and never rewritten, so a daily run costs
+        the new days only. An output that doesn't exist yet is built from
+        the first date set with set_dates.
+
+        Both outputs grow one whole day at a time, since safe_subtract
+        needs matching time axes. The update stops at the first day that
+        fails to download or subset, so that day is where the next run
+        picks up; it is listed in self.failed_downloads /
+        self.failed_subsets.
+
+        Parameters
+        ----------
+        end: datetime
+            (Optional) last day to fetch, defaults to the last date set or
+            today when no dates are set. Nothing is fetched if get_sensor
+            has no sensor for it.
+        max_workers: int
+            number of concurrent downloads
+        engine: str
+            subset engine, "netcdf" or "nco"
+        workers: int
+            number of subset processes
+
+        Returns
+        -------
+        (outfile19, outfile37)
+            paths of the updated files, (None, None) if an output doesn't
+            exist and no dates are set or end can't be fetched
+        """
+        if self.geo_list is None or self.username is None:
+            print("Bounds and login need to be set before updating")
+            return None, None
+        outfiles = {
+            "19H": os.path.join(self.working_dir, "data", self.outfile_19),
+            "37H": os.path.join(self.working_dir, "data", self.outfile_37),
+        }
+        if end is None:
+            end = datetime.today() if self.dates is None else self.dates[-1]
+        end = pd.Timestamp(end).normalize()
+        try:
+            self.get_sensor(end)
+        except KeyError:
+            print(
+                "No sensor known for {:%Y-%m-%d}, pass an earlier end".format(
+                    end
+                )
+            )
+            return None, None
+        jobs = []
+        for channel in ["19H", "37H"]:
+            last = last_time(outfiles[channel])
+            if last is not None:
+                start = pd.Timestamp(last).normalize() + timedelta(days=1)
+            elif self.dates is not None:
+                start = self.dates[0]
+            else:
+                print(
+                    "No {} output to update, set dates first".format(channel)
+                )
+                return None, None
+            jobs.extend((date, channel) for date in pd.date_range(start, end))
+        # interleave the channels again so both files grow together
+        jobs.sort(key=lambda job: job[0])
+        if len(jobs) == 0:
+            print("Outputs are already up to date")
+        else:
+            try:
+                self._stream(
+                    jobs, outfiles, max_workers, engine, workers, 32, True
+                )
+            finally:
+                self.close()
+        self.concatlist = [outfiles["19H"], outfiles["37H"]]
+        return outfiles["19H"], outfiles["37H"]
+
+    def _stream(
+        self,
+        jobs,
+        outfiles,
+        max_workers,
+        engine,
+        workers,
+        pending,
+        in_step=False,
+    ):
+        """
+        Run the download -> subset -> append stages of stream_all
+
+        Parameters
+        ----------
+        jobs: List((datetime, str))
+            (date, channel) pairs to process, appended in this order
+        outfiles: dict
+            {"19H": sink, "37H": sink}, a netCDF path to append to or a
+            ZarrWriter
+        max_workers, engine, workers, pending:
+            see stream_all
+        in_step: bool
+            append a day only once every channel of it is ready and stop
+            at the first day that failed, so the outputs keep matching
+            time axes that end right before it
+        """
+        self.nD.manifest = self.manifest
+        self.failed_downloads = []
+        self.failed_subsets = []
+        # resolves to the file ready for appending, the ledger entry if the
+        # download failed or None if the subset failed
+        ready = [Future() for _ in jobs]
+        slots = threading.Semaphore(pending)
+        stop = threading.Event()
+
+        def subsetted(i, file, infile, outfile, error):
+            # runs on the pool's result thread, which must never raise or
+            # every later result (and the appender waiting on it) hangs
+            try:
+                if error is not None:
+                    print("failing to subset {}: {}".format(file, error))
+                    self.failed_subsets.append(infile)
+                    ready[i].set_result(None)
+                    return
+                os.remove(infile)
+                self.manifest.record(
+                    file,
+                    status="subset",
+                    path=os.path.abspath(outfile),
+                    bounds=self.subset_bounds(),
+                )
+                ready[i].set_result(outfile)
+            except Exception as e:
+                ready[i].set_exception(e)
+
+        def downloaded(i, pool, future):
+            try:
+                channel = jobs[i][1]
+                result = future.result()
+                if isinstance(result, dict):
+                    # ledger entry, recorded in job order by the appender
+                    ready[i].set_result(result)
+                    return
+                file = result[0]
+                infile = os.path.join(self.nD.folder, file)
+                if not self.subBool:
+                    ready[i].set_result(infile)
+                    return
+                out_dir = self.path19 if channel == "19H" else self.path37
+                pool.apply_async(
+                    _subset_job,
+                    ((infile, out_dir + file, self.geo_list, engine),),
+                    callback=lambda error: subsetted(
+                        i, file, infile, out_dir + file, error
+                    ),
+                    error_callback=ready[i].set_exception,
+                )
+            except Exception as e:
+                ready[i].set_exception(e)
+
+        def feed(downloads, pool):
+            # like the callbacks, every job has to resolve its future or the
+            # appender waits on it forever
+            for i, (date, channel) in enumerate(jobs):
+                slots.acquire()
+                if stop.is_set():
+                    break
+                try:
+                    done = self.subset_done(date, channel)
+                    if done is not None:
+                        ready[i].set_result(done)
+                        continue
+                    future = downloads.submit(
+                        self._download_job, date, channel
+                    )
+                    future.add_done_callback(
+                        lambda future, i=i: downloaded(i, pool, future)
+                    )
+                except Exception as e:
+                    ready[i].set_exception(e)
+            else:
+                return
+            # stopped early, nothing is coming for the jobs not started
+            for future in ready[i:]:
+                if not future.done():
+                    future.set_exception(
+                        RuntimeError("Stream stopped before this job ran")
+                    )
+
+        with ThreadPoolExecutor(max_workers) as downloads, Pool(
+            workers
+        ) as pool:
+            feeder = threading.Thread(target=feed, args=(downloads, pool))
+            feeder.daemon = True
+            feeder.start()
+            if in_step:
+                days = groupby(range(len(jobs)), lambda i: jobs[i][0])
+                groups = [list(group) for _, group in days]
+            else:
+                groups = [[i] for i in range(len(jobs))]
+            try:
+                for group in tqdm.tqdm(groups):
+                    paths = [ready[i].result() for i in group]
+                    failed = [path for path in paths if isinstance(path, dict)]
+                    self.failed_downloads.extend(failed)
+                    if in_step and (failed or None in paths):
+                        print(
+                            "Stopping at {:%Y-%m-%d}, the next run starts "
+                            "there".format(jobs[group[0]][0])
+                        )
+                        break
+                    for i, path in zip(group, paths):
+                        if path is None or isinstance(path, dict):
+                            continue
+                        date, channel = jobs[i]
+                        sink = outfiles[channel]
+                        if isinstance(sink, ZarrWriter):
+                            sink.write(date, path)
+                            sink = sink.store
+                        else:
+                            append_netcdf(sink, path)
+                        os.remove(path)
+                        self.manifest.record(
+                            os.path.basename(path),
+                            status="concatenated",
+                            path=os.path.abspath(sink),
+                        )
+                    for i in group:
+                        slots.release()
+            finally:
+                # let the feeder run out instead of blocking on a slot
+                stop.set()
+                for i in range(len(jobs)):
+                    slots.release()
+                feeder.join()
 
     def convert_netcdf_zarr(self, outname19="zarr19", outname37="zarr37"):
         """
@@ -541,7 +1538,114 @@ class Swepy:
         }
         return file
 
-    def concatenate(self, outname19=None, outname37=None, all=False):
+    def get_filename(self, date, channel):
+        """
+        Name of the file nsidcDownloader saves for a date and channel
+
+        Parameters
+        ----------
+        date: datetime
+            date of the file
+        channel: str
+            19H vs 37H channel
+        """
+        url = self.nD.format_url(**self.get_file(date, channel))
+        return url.split("/")[-1]
+
+    @staticmethod
+    def file_day(file):
+        """
+        Sort key putting tB files in date order
+
+        Parameters
+        ----------
+        file: str
+            path or name of a downloaded/subsetted file
+        """
+        name = os.path.basename(file)
+        day = re.search(r"-(\d{7})-", name)
+        return name if day is None else day.group(1)
+
+    def subset_done(self, date, channel):
+        """
+        Check the manifest for a file an earlier run already subset with
+        the current bounds
+
+        Parameters
+        ----------
+        date: datetime
+            date of the file
+        channel: str
+            19H vs 37H channel
+
+        Returns
+        -------
+        path of the subsetted file, None if it still has to be downloaded
+        """
+        entry = self.manifest.get(self.get_filename(date, channel))
+        if (
+            entry is not None
+            and entry["status"] == "subset"
+            and entry["bounds"] == self.subset_bounds()
+            and os.path.exists(entry["path"])
+        ):
+            return entry["path"]
+        return None
+
+    def subset_bounds(self):
+        """
+        Subset bounds as recorded in the manifest, so files subset for
+        another study area are not reused
+
+        Returns
+        -------
+        "x_ul,y_ul,x_lr,y_lr" in map meters, None when whole grids are
+        kept
+        """
+        if not getattr(self, "subBool", False) or self.geo_list is None:
+            return None
+        return ",".join("{:.1f}".format(value) for value in self.geo_list)
+
+    def finished_batch(self, dates):
+        """
+        Check the manifest for a batch of dates scrape_all already
+        concatenated
+
+        Parameters
+        ----------
+        dates: List(datetime*)
+            dates of the batch
+
+        Returns
+        -------
+        (file19, file37) holding the batch, None if it needs to be redone
+        """
+        outputs = {"19H": set(), "37H": set()}
+        for date in dates:
+            for channel in outputs:
+                entry = self.manifest.get(self.get_filename(date, channel))
+                if (
+                    entry is None
+                    or entry["status"] != "concatenated"
+                    or entry["bounds"] != self.subset_bounds()
+                ):
+                    return None
+                outputs[channel].add(entry["path"])
+        if len(outputs["19H"]) != 1 or len(outputs["37H"]) != 1:
+            return None
+        done = (outputs["19H"].pop(), outputs["37H"].pop())
+        if not (os.path.exists(done[0]) and os.path.exists(done[1])):
+            return None
+        return done
+
+    def concatenate(
+        self,
+        outname19=None,
+        outname37=None,
+        all=False,
+        engine="nco",
+        workers=1,
+    ):
         """
         Function to concatenate files in the subsetted data folders.
         Input parameter is simply to allow for nesting of functions.
@@ -553,6 +1657,11 @@ class Swepy:
         outname37 : str
             output file name for 37GHz
         all : Boolean
+        engine : str
+            "nco" to shell out to ncrcat, "netcdf" to concatenate in one
+            pass with concat_netcdf
+        workers : int
+            number of reader processes for the netcdf engine
         """
 
         if self.subBool is False:
@@ -565,9 +1674,14 @@ class Swepy:
         outname37 = self.outfile_37 if outname37 is None else outname37
         # Concatenate 19GHz files:
         if len(self.sub19list) != 0:
-            nco.ncrcat(input=self.sub19list, output=outname19, options=["-O"])
+            self._concat_file(self.sub19list, outname19, engine, workers)
             for file in self.sub19list:
                 os.remove(file)
+                self.manifest.record(
+                    os.path.basename(file),
+                    status="concatenated",
+                    path=os.path.abspath(outname19),
+                )
             self.sub19list = []
             self.down19list = []
             if all:
@@ -578,9 +1692,14 @@ class Swepy:
             print("No 19Ghz Files to Concatenate")
         # Concatenate 37GHz files:
         if len(self.sub37list) != 0:
-            nco.ncrcat(input=self.sub37list, output=outname37, options=["-O"])
+            self._concat_file(self.sub37list, outname37, engine, workers)
             for file in self.sub37list:
                 os.remove(file)
+                self.manifest.record(
+                    os.path.basename(file),
+                    status="concatenated",
+                    path=os.path.abspath(outname37),
+                )
             self.sub37list = []
             self.down37list = []
             if all:
@@ -591,19 +1710,31 @@ class Swepy:
             print("No 37Ghz Files to Concatenate")
         return outname19, outname37
 
+    @staticmethod
+    def _concat_file(infiles, outfile, engine, workers):
+        """
+        Concatenate infiles into outfile with the chosen engine
+        """
+        if engine == "netcdf":
+            concat_netcdf(infiles, outfile, workers)
+        elif engine == "nco":
+            get_nco().ncrcat(input=infiles, output=outfile, options=["-O"])
+        else:
+            raise ValueError("Unknown concatenation engine: {}".format(engine))
+
     def final_concat(self):
         """
         Manage the final concatenation for scrape_all
         """
         if len(self.concat19list) != 0:
-            nco.ncrcat(
+            get_nco().ncrcat(
                 input=self.concat19list, output=self.outfile_19, options=["-O"]
             )
             self.concatlist[0] = self.outfile_19
         else:
             print("No 19Ghz Files to Concatenate")
         if len(self.concat37list) != 0:
-            nco.ncrcat(
+            get_nco().ncrcat(
                 input=self.concat37list, output=self.outfile_37, options=["-O"]
             )
             self.concatlist[1] = self.outfile_37
@@ -619,40 +1750,103 @@ class Swepy:
         self.concat37list = []
         return self.outfile_19, self.outfile_37
 
-    def scrape(self, dates=None):
+    def scrape(self, dates=None, max_workers=1):
         """
         Wrapper function to interface between swepy and nD
 
+        Every (date, channel) pair is an independent download job. With
+        max_workers > 1 the jobs are spread over a thread pool; the
+        download lists keep date order either way. Files the manifest
+        lists as downloaded are not requested again, and files it lists
+        as subset go straight to the subset lists. Jobs that still fail
+        after nsidcDownloader's retries are recorded in the failure ledger
+        instead of aborting the scrape: self.failed_downloads lists them
+        as {"date", "channel", "url", "error"} dicts and is reset on every
+        call. Bad credentials still raise PermissionError.
+
         Parameters
         ----------
         dates: List(datetime*)
             list of dates to scrape from
+        max_workers: int
+            number of concurrent downloads (default 1, sequential)
+
+        Returns
+        -------
+        (result19, result37)
+            download results of the last two jobs
         """
         if self.local_session is False:
             if self.check_params() is False:
                 return
         if dates is None:  # letting class choose all dates
             dates = self.dates
-        for date in tqdm(dates):
-            file19 = self.get_file(date, "19H")
-            file37 = self.get_file(date, "37H")
-            result1 = self.nD.download_file(**file19)
-            if result1 is False:
-                try:
-                    result1 = self.nD.download_file(**file19)
-                except:
-                    print("failing on 19H {}".format(date))
-                    pass
-            result2 = self.nD.download_file(**file37)
-            if result2 is False:
-                try:
-                    result2 = self.nD.download_file(**file37)
-                except:
-                    print("failing on 37H on {}".format(date))
-                    pass
-            self.down19list.append(result1[0])
-            self.down37list.append(result2[0])
-        return (result1, result2)
+        self.failed_downloads = []
+        self.nD.manifest = self.manifest
+        jobs = []
+        for date in dates:
+            for channel in ["19H", "37H"]:
+                done = self.subset_done(date, channel)
+                if done is None:
+                    jobs.append((date, channel))
+                elif channel == "19H":
+                    self.sub19list.append(done)
+                else:
+                    self.sub37list.append(done)
+        if max_workers > 1:
+            with ThreadPoolExecutor(max_workers=max_workers) as pool:
+                results = list(
+                    tqdm.tqdm(
+                        pool.map(lambda job: self._download_job(*job), jobs),
+                        total=len(jobs),
+                    )
+                )
+        else:
+            results = [self._download_job(*job) for job in tqdm.tqdm(jobs)]
+        for (date, channel), result in zip(jobs, results):
+            if isinstance(result, dict):
+                self.failed_downloads.append(result)
+            elif channel == "19H":
+                self.down19list.append(result[0])
+            else:
+                self.down37list.append(result[0])
+        if len(results) < 2:
+            return (None, None)
+        return (results[-2], results[-1])
+
+    def _download_job(self, date, channel):
+        """
+        Download the file for a single date and channel
+
+        Transient errors are retried by nsidcDownloader, anything that still
+        fails is returned as an entry for the failure ledger. Bad
+        credentials fail every file alike and are raised instead.
+
+        Parameters
+        ----------
+        date: datetime
+            date to download
+        channel: str
+            19H vs 37H channel
+
+        Returns
+        -------
+        [filename, bool] from nsidcDownloader.download_file, or a
+        {"date", "channel", "url", "error"} dict if the download failed
+        """
+        file = self.get_file(date, channel)
+        try:
+            return self.nD.download_file(**file)
+        except PermissionError:
+            raise
+        except Exception as e:
+            print("failing on {} {}".format(channel, date))
+            return {
+                "date": date,
+                "channel": channel,
+                "url": self.nD.format_url(**file),
+                "error": repr(e),
+            }
 
     @staticmethod
     def safe_subtract(tb19, tb37):
@@ -700,6 +1894,12 @@ class Swepy:
             os.remove(f)
         return
 
+    def close(self):
+        """
+        Close the manifest database, the workflows do so when they finish
+        """
+        self.manifest.close()
+
     def check_params(self):
         """
         Helper function to check that all the class members are set before
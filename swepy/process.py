@@ -7,17 +7,20 @@ from numpy import newaxis
 from numpy import shape
 import pandas as pd
 import swepy.downsample as down
+import swepy.parallel as parallel
 import math
 from scipy.signal import savgol_filter
 from scipy.cluster.vq import *
 import jenkspy
 import numpy.ma as ma
 from netCDF4 import Dataset
-from multiprocessing import Pool, Process, cpu_count
 import netCDF4
+from swepy.lazy import lazy_import
 
+xarray = lazy_import("xarray")
 
-def get_array(file, downsample=True):
+
+def get_array(file, downsample=True, out=None, block=64, chunks=None):
     """
     Take 19H and 37H netCDF files, open and store tb
     data in np arrays
@@ -26,22 +29,99 @@ def get_array(file, downsample=True):
     -----------
     file: str
         filename for 19H or 37H file
-    high: bool
-        true = high resolution imagery (3.125km/6.25km)
-        false = low resolution imagery (25km)
+    downsample: bool
+        downsample 3.125km (37H) imagery to 6.25km to match 19H
+    out: str
+        (Optional) .npy file to read TB into instead of memory. The file is
+        filled block days at a time and returned as a float32 np.memmap
+        with nan for missing values, so cubes larger than memory can be
+        processed in blocks.
+    block: int
+        (Optional) number of days read at once when out is given
+    chunks: int or (int, int)
+        (Optional) return a lazy dask array instead, split in (x, y) tiles
+        of this size with full time depth. Missing values are nan and the
+        rest of the processing functions stay lazy on it; needs dask.
     """
+    if chunks is not None:
+        return _dask_array(file, downsample, chunks)
     fid = Dataset(file, "r", format="NETCDF4")
+    high = fid.variables["crs"].long_name == "EASE2_N3.125km"
+    if out is not None:
+        tb = fid.variables["TB"]
+        factor = 2 if downsample and high else 1
+        shape = (len(tb),) + tuple(-(-n // factor) for n in tb.shape[1:])
+        cube = np.lib.format.open_memmap(
+            out, mode="w+", dtype=np.float32, shape=shape
+        )
+        for start in range(0, shape[0], block):
+            part = tb[start : start + block]
+            if factor > 1:
+                part = _downsample(part)
+            cube[start : start + block] = ma.filled(
+                ma.asarray(part, dtype=np.float32), np.nan
+            )
+        cube.flush()
+        fid.close()
+        return cube
     tb = fid.variables["TB"][:]
-    if downsample and fid.variables["crs"].long_name == "EASE2_N3.125km":
-        tb[tb.mask] = 0.00001
-        tb = down.downsample(tb, block_size=(1, 2, 2), func=np.mean)
+    if downsample and high:
         fid.close()
-        return ma.masked_values(tb, 0.00001)
+        return _downsample(tb)
     else:
         fid.close()
         return tb
 
 
+def _import_dask():
+    """
+    Import dask.array for the lazy (chunks=...) mode, which is optional
+    """
+    try:
+        import dask.array as da
+    except ImportError:
+        raise ImportError(
+            "Lazy cubes need dask, install it with: conda install dask"
+        )
+    return da
+
+
+def _is_dask(cube):
+    """
+    Check for a dask array without importing dask
+    """
+    return type(cube).__module__.startswith("dask")
+
+
+def _dask_array(file, downsample, chunks):
+    """
+    Lazy TB cube of a file in time complete chunks, see get_array
+    """
+    da = _import_dask()
+    if np.ndim(chunks) == 0:
+        chunks = (chunks, chunks)
+    ds = xarray.open_dataset(file, chunks={"time": -1})
+    tb = ds["TB"].data.astype(np.float32)
+    if downsample and ds["crs"].long_name == "EASE2_N3.125km":
+        # even tiles, so every block of the output comes from one tile
+        tb = tb.rechunk((-1,) + tuple(2 * n for n in chunks))
+        tb = tb.map_blocks(
+            _downsample,
+            chunks=tb.chunks[:1]
+            + tuple(tuple(-(-n // 2) for n in axis) for axis in tb.chunks[1:]),
+            dtype=np.float32,
+        )
+        return tb
+    return tb.rechunk((-1,) + tuple(chunks))
+
+
+def _downsample(tb):
+    """
+    Average the valid values of 2x2 blocks of a 3.125km cube down to 6.25km
+    """
+    return down.downsample_mean(tb, block_size=(1, 2, 2))
+
+
 def pandas_fill(arr):
     """
     Given 2d array, convert to pd dataframe
@@ -58,26 +138,64 @@ def pandas_fill(arr):
     return out
 
 
-def vector_clean(cube):
+def vector_clean(cube, block=None):
     """
     Clean erroneous spikes out of 37Ghz cube
 
+    Every time step is filled at once with a single maximum.accumulate and
+    gather over the whole cube, or over block time steps at a time.
+
     Parameters
     -----------
     cube: np.array(t,x,y)
         np array time cube of 37GHz tb data
+    block: int
+        (Optional) number of time steps cleaned at once to bound the
+        temporaries, defaults to the whole cube in memory and 64 steps for
+        a memory mapped cube (see get_array), which is cleaned in place
     Note: "cube" can be used with other arrays but is looking for patterns in 37H files
     """
-    cube[cube == 0] = np.nan
-    for i in range(np.shape(cube)[0]):
-        arr = cube[i, :, :]
-        mask = np.isnan(arr)
-        idx = np.where(~mask, np.arange(mask.shape[1]), 0)
-        np.maximum.accumulate(idx, axis=1, out=idx)
-        cube[i, :, :] = arr[np.arange(idx.shape[0])[:, None], idx]
+    if _is_dask(cube):
+        # values are carried along the last axis, which has to be whole
+        return cube.rechunk({2: -1}).map_blocks(_clean_block)
+    if block is None:
+        block = 64 if isinstance(cube, np.memmap) else max(len(cube), 1)
+    for start in range(0, np.shape(cube)[0], block):
+        part = cube[start : start + block]
+        part[part == 0] = np.nan
+        mask = np.isnan(part)
+        idx = np.where(~mask, np.arange(mask.shape[2]), 0)
+        np.maximum.accumulate(idx, axis=2, out=idx)
+        cube[start : start + block] = np.take_along_axis(part, idx, axis=2)
     return cube
 
 
+def _clean_block(block):
+    """
+    vector_clean a copy of a dask block
+    """
+    return vector_clean(np.array(block))
+
+
+def _savgol_params(t):
+    """
+    Window length and polynomial order of the sav-gol filter for a time
+    vector of length t
+
+    Parameters
+    -----------
+    t: int
+        length of the time vector, at least 2
+    """
+    if t < 51:
+        window = t - 1 if t % 2 == 0 else t
+        poly = 3 if window > 3 else window - 1
+    else:
+        window = 51
+        poly = 3
+    return window, poly
+
+
 def __filter(cube):
     """
     Apply a sav-gol filter from scipy to time vector's of cube
@@ -92,14 +210,7 @@ def __filter(cube):
     if shapecube[0] == 1:
         print("Cannot smooth a cube with time vector of length 1.")
         return ValueError
-    elif (
-        shapecube[0] < 51
-    ):  # when time vector is len(1) --> concat over itself to make len(3)
-        window = shapecube[0] - 1 if shapecube[0] % 2 == 0 else shapecube[0]
-        poly = 3 if window > 3 else window - 1
-    else:
-        window = 51
-        poly = 3
+    window, poly = _savgol_params(shapecube[0])
     for x in range(shapecube[1]):
         for y in range(shapecube[2]):
             pixel_drill = cube[:, x, y]
@@ -110,32 +221,114 @@ def __filter(cube):
     return smooth_cube
 
 
-def apply_filter(cube):
+def time_fill(cube):
+    """
+    Forward fill missing (nan or masked) values along the time axis of a
+    cube, what pandas_fill does for a single time vector
+
+    Parameters
+    -----------
+    cube: np.array(t,x,y)
+        time cube, values missing at the first time step stay nan
+    """
+    cube = ma.filled(ma.asarray(cube, dtype=np.float64), np.nan)
+    idx = np.where(
+        np.isnan(cube), 0, np.arange(cube.shape[0])[:, newaxis, newaxis]
+    )
+    np.maximum.accumulate(idx, axis=0, out=idx)
+    return np.take_along_axis(cube, idx, axis=0)
+
+
+def vector_filter(cube, tile=None, out=None):
+    """
+    Apply the sav-gol filter of apply_filter to every time vector at once
+
+    The whole cube is forward filled with numpy and smoothed with a single
+    savgol_filter call along the time axis, using the same window and
+    polynomial order as the per pixel filter.
+
+    Parameters
+    -----------
+    cube: np.array(t,x,y)
+        np array time cube of swe for passive microwave data
+    tile: (int, int)
+        (Optional) smooth (x, y) tiles of this size one at a time to bound
+        the float64 copies made along the way
+    out: str
+        (Optional) .npy file to write the smoothed cube to, one tile at a
+        time, instead of memory
+    """
+    shapecube = np.shape(cube)
+    if shapecube[0] == 1:
+        print("Cannot smooth a cube with time vector of length 1.")
+        return ValueError
+    if _is_dask(cube):
+        return cube.rechunk({0: -1}).map_blocks(
+            vector_filter, dtype=np.float64
+        )
+    window, poly = _savgol_params(shapecube[0])
+    if tile is None:
+        tile = shapecube[1:]
+    if out is None:
+        smooth_cube = np.empty(shapecube)
+    else:
+        smooth_cube = np.lib.format.open_memmap(
+            out, mode="w+", dtype=np.float64, shape=shapecube
+        )
+    for x in range(0, shapecube[1], tile[0]):
+        for y in range(0, shapecube[2], tile[1]):
+            part = (slice(None), slice(x, x + tile[0]), slice(y, y + tile[1]))
+            yhat = savgol_filter(time_fill(cube[part]), window, poly, axis=0)
+            yhat[yhat < 2] = 0
+            smooth_cube[part] = yhat
+    return smooth_cube
+
+
+def apply_filter(cube, engine="pool", workers=None, out=None, tile=None):
     """
     Function to apply the filter function in a parralel fashion
     Makes use of a Pool to process on every available core
 
+    The pool works on a memory mapped copy of the cube and writes into a
+    memory mapped output (see swepy.parallel), so neither the cube nor the
+    smoothed result is pickled between processes.
+
     Parameters
     -----------
     cube: np.array
         numpy array of data, should be 3d (x,x,x)
+    engine: str
+        "pool" to filter pixel by pixel on every core, "vector" to filter
+        the whole cube at once with vector_filter. Dask cubes are always
+        filtered lazily with vector_filter, chunk by chunk.
+    workers: int
+        (Optional) number of processes for the pool engine, defaults to
+        every core
+    out: str
+        (Optional) .npy file to write the smoothed cube to instead of a
+        temporary file
+    tile: (int, int)
+        (Optional) process (x, y) tiles of at most this size with full time
+        depth, so memory use doesn't grow with the grid. The pool engine
+        only splits the last (y) axis, into strips of tile[1] columns
+        spanning every x; tile[0] is used by the vector engine only.
     """
-    cpus = cpu_count()
-    try:
-        swe_parts = np.array_split(cube, cpus, axis=2)
-    except IndexError:
-        print(
-            "Array Provided does not have a 2nd axis to split on. Please provide a 3 dimensional cube."
-        )
-    with Pool(cpus) as p:
-        parts = p.map(__filter, swe_parts)
-        try:
-            return np.concatenate(parts, axis=2)  # recombine split cube
-        except ValueError:
-            # FIND WAY TO GET HERE VIA TEST SUITE (1 CORE)
-            print(
-                "Array provided is smaller than # of cores available. Exiting"
-            )
+    if np.ndim(cube) != 3:
+        raise ValueError("Please provide a 3 dimensional cube.")
+    if engine == "vector" or _is_dask(cube):
+        return vector_filter(cube, tile=tile, out=out)
+    if np.shape(cube)[0] == 1:
+        print("Cannot smooth a cube with time vector of length 1.")
+        return ValueError
+    return parallel.map_blocks(
+        __filter,
+        cube,
+        axis=2,
+        dtype=np.float64,
+        workers=workers,
+        block=None if tile is None else tile[1],
+        out=out,
+    )
 
 
 def mask_ocean_winter(swe_matrix, day=0, nclasses=3):
@@ -149,28 +342,55 @@ def mask_ocean_winter(swe_matrix, day=0, nclasses=3):
     Parameters
     ----------
     swe_matrix: np.array
-        swe time cube
+        swe time cube, a dask cube gets a lazily masked copy
     day: int
         julian date of time series to use for classification (should be winter)
     nclasses: int
         number of classes to use in jenks classification, defaults to 3
     """
+    if _is_dask(swe_matrix):
+        # only the winter day is computed, the masking stays lazy
+        winter_day = np.array(swe_matrix[day, :, :])
+        ocean = _ocean_pixels(winter_day, nclasses)
+        da = _import_dask()
+        return da.where(ocean[np.newaxis, :, :], -8888, swe_matrix)
     winter_day = swe_matrix[day, :, :]
-    classes_jenk = jenkspy.jenks_breaks(winter_day.ravel(), nclasses)
-    mask = classes_jenk == 1
-    winter_day[mask] = -8888
+    ocean = _ocean_pixels(winter_day, nclasses)
     matrix_mask = np.zeros(swe_matrix.shape, dtype=bool)
-    matrix_mask[:, :, :] = winter_day[np.newaxis, :, :] == -8888
+    matrix_mask[:, :, :] = ocean[np.newaxis, :, :]
     swe_matrix[matrix_mask] = -8888
     return swe_matrix
 
 
-def safe_subtract(tb19, tb37):
+def _ocean_pixels(winter_day, nclasses):
+    """
+    Classify a winter day and flag its ocean pixels (-8888), for
+    mask_ocean_winter
+    """
+    classes_jenk = jenkspy.jenks_breaks(winter_day.ravel(), nclasses)
+    mask = classes_jenk == 1
+    winter_day[mask] = -8888
+    return winter_day == -8888
+
+
+def safe_subtract(tb19, tb37, out=None, block=64):
     """
     Check size of each file, often the 19 and 37
     matrices are one unit off of eachother.
 
     Chops the larger matrix to match the smaller matrix
+
+    Parameters
+    ----------
+    tb19: np.array
+        19H cube
+    tb37: np.array
+        37H cube
+    out: str
+        (Optional) .npy file to write the difference to, block days at a
+        time, instead of memory
+    block: int
+        (Optional) number of days subtracted at once when out is given
     """
 
     shape1 = np.shape(tb19)
@@ -187,11 +407,23 @@ def safe_subtract(tb19, tb37):
         s1[2] = s2[2]
     tb19 = tb19[:, : s1[1] - 1, : s1[2] - 1]
     tb37 = tb37[:, : s2[1] - 1, : s2[2] - 1]
-    tb = tb19 - tb37
+    if out is None:
+        tb = tb19 - tb37
+        return tb
+    tb = np.lib.format.open_memmap(
+        out,
+        mode="w+",
+        dtype=np.result_type(tb19.dtype, tb37.dtype),
+        shape=tb19.shape,
+    )
+    for start in range(0, tb.shape[0], block):
+        days = slice(start, start + block)
+        tb[days] = ma.filled(tb19[days] - tb37[days], np.nan)
+    tb.flush()
     return tb
 
 
-def save_file(metafile, array, outname):
+def save_file(metafile, array, outname, block=64):
     """
     Save processed array back out to a new netCDF file
 
@@ -205,6 +437,9 @@ def save_file(metafile, array, outname):
         processed TB array
     outname: str
         name for output file
+    block: int
+        (Optional) number of days written at once, so memory mapped arrays
+        are streamed to the file
     """
     toexclude = ["TB"]
     # Open old file and get info
@@ -230,5 +465,11 @@ def save_file(metafile, array, outname):
         dst.createVariable(
             "TB", src.variables["TB"].datatype, src.variables["TB"].dimensions
         )
-        dst["TB"][:] = array[:]
+        if _is_dask(array):
+            # compute every chunk once, straight into the file
+            array.store(dst["TB"], lock=True)
+            return outname
+        for start in range(0, max(np.shape(array)[0], 1), block):
+            days = slice(start, start + block)
+            dst["TB"][days] = array[days]
     return outname
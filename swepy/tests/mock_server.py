@@ -22,8 +22,8 @@ class HTTPServer(BaseHTTPServer):
         BaseHTTPServer.__init__(self, server_address, RequestHandlerClass)
 
 
-web_dir = os.path.join(os.path.dirname(__file__), "data")
-httpd = HTTPServer(web_dir, ("", 8000))
-httpd.serve_forever()
-
 # serves files on localhost:8000/file_name
+if __name__ == "__main__":
+    web_dir = os.path.join(os.path.dirname(__file__), "data")
+    httpd = HTTPServer(web_dir, ("", 8000))
+    httpd.serve_forever()
@@ -40,7 +40,7 @@ def test_create_splits():
     swe = np.zeros((3000, 50, 50))
     a = analysis.Analysis(datetime.date(1993, 1, 1), swe)
     years = a.create_year_splits()
-    assert years == [0, 365, 730, 1095, 1460, 1826, 2191, 2556, 2921, 3000]
+    assert years == [0, 365, 730, 1095, 1461, 1826, 2191, 2556, 2922, 3000]
 
 
 def test_count_melt_onset_mp():
@@ -86,6 +86,21 @@ def test_count_melt():
     assert type(c) == pd.DataFrame
 
 
+def test_count_melt_values():
+    """
+    Ensure every pixel is counted once per year, on its first zero day
+    """
+    swe = np.ones((730, 2, 2))
+    swe[100:, 0, 0] = 0
+    swe[200, 0, 1] = 0
+    swe[400:, 1, 0] = 0
+    a = analysis.Analysis(datetime.date(1993, 1, 1), swe)
+    c = a._count_melt(swe)["count"].values
+    assert c[100] == 1 and c[200] == 1
+    assert c[365] == 1 and c[400] == 1
+    assert c.sum() == 4
+
+
 def test_summer_length():
     """
     Ensure summer length info is returned in a dictionary
@@ -106,6 +121,26 @@ def test_summer_length2():
     assert type(c[(1, 1)]) == dict
 
 
+def test_summer_lengths_values():
+    """
+    Ensure summer lengths count the first zero stretch of each year
+    """
+    swe = np.ones((730, 2, 2))
+    swe[100:150, 0, 0] = 0
+    swe[300:310, 0, 0] = 0
+    swe[465:525, 0, 0] = 0
+    swe[700:, 1, 1] = 0
+    a = analysis.Analysis(datetime.date(1993, 1, 1), swe)
+    lengths = a.summer_lengths()
+    assert lengths.dtype == np.int16 and lengths.shape == (2, 2, 2)
+    assert list(lengths[:, 0, 0]) == [50, 60]
+    assert list(lengths[:, 1, 1]) == [0, 30]
+    assert a.summer_length(swe)[(0, 0)] == {1993: 50, 1994: 60}
+    diff, diffmap = a.summer_diff(lengths)
+    assert diffmap[0, 0] == 10 and diffmap[0, 1] == 0
+    assert a.summer_diff(a.summer_length(swe))[0] == diff
+
+
 def test_summer_diff1():
     """
     Ensure summer length difference is close to zero on test array
@@ -183,4 +218,28 @@ def test_create_splits_mid_year():
     swe = np.zeros((3000, 50, 50))
     a = analysis.Analysis(datetime.date(1993, 5, 1), swe)
     years = a.create_year_splits()
-    assert years[0] == 121
+    assert years[:3] == [0, 245, 610]
+
+
+def test_year_index_leap():
+    """
+    Ensure leap years after 2016 are split on the right day
+    """
+    swe = np.zeros((800, 2, 2))
+    a = analysis.Analysis(datetime.date(2019, 1, 1), swe)
+    assert a.years == [2019, 2020, 2021]
+    assert a.year_splits == [0, 365, 731, 800]
+
+
+def test_year_slices_water_year():
+    """
+    Ensure water years run from October 1st and are named by their end
+    """
+    swe = np.zeros((400, 2, 2))
+    a = analysis.Analysis(datetime.date(2010, 9, 1), swe, water_year=True)
+    assert a.year_slices() == {
+        2010: slice(0, 30),
+        2011: slice(30, 395),
+        2012: slice(395, 400),
+    }
+    assert list(a.year_slices(water_year=False)) == [2010, 2011]
@@ -3,6 +3,10 @@ from swepy.nsidcDownloader import nsidcDownloader
 import glob
 import pytest
 import datetime
+import re
+import threading
+import requests
+from swepy.tests.mock_server import HTTPHandler, HTTPServer
 
 
 def test_nD_local():
@@ -62,3 +66,241 @@ def test_file_not_found():
         }
         nD = nsidcDownloader(no_auth=True)
         nD.download_file(**file)
+
+
+local_file = {
+    "protocol": "http",
+    "server": "localhost:8000",
+    "resolution": "6.25km",
+    "platform": "F17",
+    "sensor": "SSMIS",
+    "date1": datetime.date(2010, 1, 1),
+    "date2": datetime.date(2010, 1, 1),
+    "channel": "19H",
+}
+local_name = "NSIDC-0630-EASE2_N6.25km-F17_SSMIS-2010001-19H-M-SIR-CSU-v1.3.nc"
+local_size = os.path.getsize(
+    os.path.join(os.path.dirname(__file__), "data", local_name)
+)
+
+
+def test_resume_part_file(tmpdir):
+    """
+    Ensure a leftover .part file is completed and renamed
+    """
+    with open(os.path.join(str(tmpdir), local_name + ".part"), "wb") as f:
+        f.write(b"\0" * 1000)
+    nD = nsidcDownloader(folder=str(tmpdir), no_auth=True)
+    nD.download_file(**local_file)
+    assert os.listdir(str(tmpdir)) == [local_name] and (
+        os.path.getsize(os.path.join(str(tmpdir), local_name)) == local_size
+    )
+
+
+class RangeHandler(HTTPHandler):
+    """
+    mock_server handler that honours "Range: bytes=N-" with 206 responses
+    """
+
+    ranges = []
+
+    def send_head(self):
+        match = re.match(r"bytes=(\d+)-$", self.headers.get("Range", ""))
+        path = self.translate_path(self.path)
+        if match is None or not os.path.isfile(path):
+            return HTTPHandler.send_head(self)
+        start = int(match.group(1))
+        size = os.path.getsize(path)
+        self.ranges.append(start)
+        if start >= size:
+            self.send_response(416)
+            self.send_header("Content-Range", "bytes */{}".format(size))
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return None
+        f = open(path, "rb")
+        f.seek(start)
+        self.send_response(206)
+        self.send_header("Content-Type", "application/octet-stream")
+        self.send_header(
+            "Content-Range", "bytes {}-{}/{}".format(start, size - 1, size)
+        )
+        self.send_header("Content-Length", str(size - start))
+        self.end_headers()
+        return f
+
+    def log_message(self, format, *args):
+        pass
+
+
+class UnsizedHandler(RangeHandler):
+    """
+    mock_server handler that ignores Range and sends the whole file with
+    a 200 and no Content-Length, like a chunked or streamed response
+    """
+
+    def send_head(self):
+        path = self.translate_path(self.path)
+        if "Range" not in self.headers or not os.path.isfile(path):
+            return HTTPHandler.send_head(self)
+        self.ranges.append(None)
+        self.send_response(200)
+        self.send_header("Content-Type", "application/octet-stream")
+        self.end_headers()
+        return open(path, "rb")
+
+
+def serve_data(handler):
+    """
+    Serve the test data with handler on a free port
+    """
+    handler.ranges = []
+    server = HTTPServer(
+        os.path.join(os.path.dirname(__file__), "data"),
+        ("localhost", 0),
+        handler,
+    )
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
+
+
+@pytest.fixture
+def range_server():
+    """
+    Serve the test data with a server that supports partial content
+    """
+    server = serve_data(RangeHandler)
+    yield "localhost:{}".format(server.server_address[1])
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def unsized_server():
+    """
+    Serve the test data with a server that ignores Range and sends no
+    Content-Length
+    """
+    server = serve_data(UnsizedHandler)
+    yield "localhost:{}".format(server.server_address[1])
+    server.shutdown()
+    server.server_close()
+
+
+def test_resume_partial_content(tmpdir, range_server):
+    """
+    Ensure a .part file is resumed with a 206 response and only the
+    missing bytes are appended
+    """
+    with open(
+        os.path.join(os.path.dirname(__file__), "data", local_name), "rb"
+    ) as f:
+        original = f.read()
+    with open(os.path.join(str(tmpdir), local_name + ".part"), "wb") as f:
+        f.write(original[:1000])
+    nD = nsidcDownloader(folder=str(tmpdir), no_auth=True)
+    nD.download_file(**{**local_file, "server": range_server})
+    with open(os.path.join(str(tmpdir), local_name), "rb") as f:
+        assert f.read() == original
+    assert RangeHandler.ranges == [1000]
+    assert nD.transfers[0]["bytes"] == local_size - 1000
+    assert os.listdir(str(tmpdir)) == [local_name]
+
+
+def test_resume_ignored_unsized(tmpdir, unsized_server):
+    """
+    Ensure a full 200 response to a Range request replaces the .part file
+    instead of being appended to it, even without a Content-Length
+    """
+    with open(
+        os.path.join(os.path.dirname(__file__), "data", local_name), "rb"
+    ) as f:
+        original = f.read()
+    with open(os.path.join(str(tmpdir), local_name + ".part"), "wb") as f:
+        f.write(original[:1000])
+    nD = nsidcDownloader(folder=str(tmpdir), no_auth=True)
+    nD.download_file(**{**local_file, "server": unsized_server})
+    with open(os.path.join(str(tmpdir), local_name), "rb") as f:
+        assert f.read() == original
+    assert UnsizedHandler.ranges == [None]
+
+
+def test_truncated_file_redownloaded(tmpdir):
+    """
+    Ensure an existing file that is smaller than the server's copy
+    does not count as downloaded
+    """
+    with open(os.path.join(str(tmpdir), local_name), "wb") as f:
+        f.write(b"\0" * 1000)
+    nD = nsidcDownloader(folder=str(tmpdir), no_auth=True)
+    nD.download_file(**local_file)
+    assert os.path.getsize(os.path.join(str(tmpdir), local_name)) == local_size
+
+
+def test_backoff_capped():
+    """
+    Ensure jittered backoff delays stay between zero and max_backoff
+    """
+    nD = nsidcDownloader(no_auth=True, backoff=1.0, max_backoff=5.0)
+    delays = [nD.backoff_delay(attempt) for attempt in range(10)]
+    assert min(delays) >= 0 and max(delays) <= 5.0
+
+
+def test_retry_transient(tmpdir, monkeypatch):
+    """
+    Ensure connection errors are retried until the download succeeds
+    """
+    nD = nsidcDownloader(folder=str(tmpdir), no_auth=True, backoff=0)
+    calls = []
+    fetch = nD._fetch
+
+    def flaky_fetch(*args):
+        calls.append(args)
+        if len(calls) < 3:
+            raise requests.ConnectionError("connection reset")
+        return fetch(*args)
+
+    monkeypatch.setattr(nD, "_fetch", flaky_fetch)
+    result = nD.download_file(**local_file)
+    assert result == [local_name, True] and len(calls) == 3
+
+
+def test_no_retry_not_found(tmpdir, monkeypatch):
+    """
+    Ensure a missing file fails on the first attempt
+    """
+    nD = nsidcDownloader(folder=str(tmpdir), no_auth=True, backoff=0)
+    calls = []
+    fetch = nD._fetch
+
+    def counted_fetch(*args):
+        calls.append(args)
+        return fetch(*args)
+
+    monkeypatch.setattr(nD, "_fetch", counted_fetch)
+    with pytest.raises(FileNotFoundError):
+        nD.download_file(**{**local_file, "grid": "K"})
+    assert len(calls) == 1
+
+
+def test_chunk_size_adaptive():
+    """
+    Ensure the streaming buffer stays within its bounds and honors
+    a fixed chunk size
+    """
+    nD = nsidcDownloader(no_auth=True)
+    sizes = [nD.get_chunk_size(n) for n in [None, 10, 2 ** 40]]
+    fixed = nsidcDownloader(no_auth=True, chunk_size=4096)
+    assert sizes == [nD.min_chunk_size, nD.min_chunk_size, nD.max_chunk_size]
+    assert fixed.get_chunk_size(2 ** 40) == 4096
+
+
+def test_transfer_log(tmpdir):
+    """
+    Ensure throughput is recorded for every downloaded file
+    """
+    nD = nsidcDownloader(folder=str(tmpdir), no_auth=True)
+    nD.download_file(**local_file)
+    assert nD.transfers[0]["file"] == local_name
+    assert nD.transfers[0]["bytes"] == local_size
@@ -9,3 +9,29 @@ def swe():
     print(os.listdir())
     swe = np.load("swepy/tests/swe_testfile.npy")
     return swe
+
+
+def test_downsample_mean_masked():
+    """
+    Ensure masked values are left out of block means
+    """
+    im = np.ma.masked_array(
+        np.arange(1.0, 17.0).reshape(1, 4, 4),
+        mask=[[[1, 0, 1, 1], [0, 0, 1, 1], [0] * 4, [0] * 4]],
+    )
+    out = downsample.downsample_mean(im, (1, 2, 2))
+    assert out.dtype == np.float64 and out.shape == (1, 2, 2)
+    assert out[0, 0, 0] == (2 + 5 + 6) / 3
+    assert out.mask[0, 0, 1] and not out.mask[0, 1, 1]
+
+
+def test_downsample_mean_nan_edges():
+    """
+    Ensure nan values are skipped and uneven edges are averaged
+    """
+    im = np.ones((1, 3, 3), dtype=np.uint16)
+    out = downsample.downsample_mean(im, (1, 2, 2))
+    assert out.dtype == np.float32 and out.shape == (1, 2, 2)
+    assert (out == 1).all()
+    im = np.full((1, 2, 2), np.nan)
+    assert np.isnan(downsample.downsample_mean(im, (1, 2, 2))).all()
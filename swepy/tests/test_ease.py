@@ -2,6 +2,9 @@ import os
 from swepy.easeReproject import EaseReproject
 import glob
 import pytest
+import numpy as np
+import pickle
+import threading
 
 
 def test_ease_nogrid():
@@ -29,3 +32,43 @@ def test_grid_to_geo():
 def test_verbose():
     n25g = EaseReproject("EASE2_N25km", verbose=True)
     assert isinstance(n25g, EaseReproject)
+
+
+def test_grid_to_map_array():
+    n25g = EaseReproject("EASE2_N25km")
+    x, y = n25g.grid_to_map_array([-0.5, 719.5], [-0.5, 719.5])
+    assert list(x) == [-9000000.0, 9000000.0]
+    assert list(y) == [9000000.0, -9000000.0]
+    rows, cols = n25g.map_to_grid_array(x, y)
+    assert np.allclose(rows, [-0.5, 719.5]) and np.allclose(
+        cols, [-0.5, 719.5]
+    )
+
+
+def test_geographic_array_matches_points():
+    n6g = EaseReproject("EASE2_N6.25km")
+    rows, cols = np.mgrid[100:103, 700:704]
+    lats, lons = n6g.grid_to_geographic_array(rows, cols)
+    assert lats.shape == (3, 4)
+    assert (lats[1, 2], lons[1, 2]) == pytest.approx(
+        n6g.grid_to_geographic(101, 702)
+    )
+    back = n6g.geographic_to_grid_array(lats, lons)
+    assert np.allclose(back[0], rows) and np.allclose(back[1], cols)
+
+
+def test_for_grid_shared():
+    n25g = EaseReproject.for_grid("EASE2_N25km")
+    assert EaseReproject.for_grid("EASE2_N25km") is n25g
+    assert EaseReproject.for_grid("EASE2_S25km") is not n25g
+    assert pickle.loads(pickle.dumps(n25g)) is n25g
+
+
+def test_transform_per_thread():
+    n25g = EaseReproject.for_grid("EASE2_N25km")
+    found = []
+    thread = threading.Thread(target=lambda: found.append(n25g.projToGeog))
+    thread.start()
+    thread.join()
+    assert found[0] is not n25g.projToGeog
+    assert n25g.projToGeog is n25g.projToGeog
@@ -0,0 +1,64 @@
+import swepy.latlon as latlon
+from swepy.easeReproject import EaseReproject
+from swepy.pipeline import subset_netcdf
+import numpy as np
+import os
+from netCDF4 import Dataset
+
+data_19 = os.path.join(
+    os.path.dirname(__file__),
+    "data",
+    "NSIDC-0630-EASE2_N6.25km-F17_SSMIS-2010001-19H-M-SIR-CSU-v1.3.nc",
+)
+bounds = [-1800000.0, 2600000.0, -1500000.0, 2300000.0]
+
+
+def test_grid_shape():
+    """
+    Ensure grid sizes follow the EASE2 definitions
+    """
+    assert latlon.grid_shape(EaseReproject("EASE2_N25km")) == (720, 720)
+    assert latlon.grid_shape(EaseReproject("EASE2_S3.125km")) == (5760, 5760)
+    assert latlon.grid_shape(EaseReproject("EASE2_T25km")) == (540, 1388)
+
+
+def test_cache_dir(monkeypatch, tmpdir):
+    """
+    Ensure the cache directory can be moved with the environment
+    """
+    monkeypatch.setenv("SWEPY_CACHE_DIR", str(tmpdir))
+    assert latlon.cache_dir() == str(tmpdir)
+    monkeypatch.delenv("SWEPY_CACHE_DIR")
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmpdir))
+    assert latlon.cache_dir() == os.path.join(str(tmpdir), "swepy")
+
+
+def test_latlon_table(tmpdir):
+    """
+    Ensure tables are projected once and then mapped from disk
+    """
+    lats, lons = latlon.latlon_table("EASE2_N25km", str(tmpdir), block=100)
+    assert isinstance(lats, np.memmap) and lats.shape == (720, 720)
+    ease = EaseReproject("EASE2_N25km")
+    assert np.allclose(
+        (lats[300, 500], lons[300, 500]), ease.grid_to_geographic(300, 500)
+    )
+    assert sorted(os.listdir(str(tmpdir))) == [
+        "EASE2_N25km_lat.npy",
+        "EASE2_N25km_lon.npy",
+    ]
+    again = latlon.latlon_table("EASE2_N25km", str(tmpdir))
+    assert np.array_equal(again[0], lats)
+
+
+def test_window_matches_subset(tmpdir):
+    """
+    Ensure the lookup window covers the pixels the subset engine keeps
+    """
+    ease = EaseReproject("EASE2_N6.25km")
+    rows, cols = latlon.grid_window(ease, bounds)
+    out = subset_netcdf(data_19, str(tmpdir.join("sub.nc")), bounds)
+    with Dataset(out) as f:
+        x, y = f["x"][:], f["y"][:]
+    assert (rows.stop - rows.start, cols.stop - cols.start) == (len(y), len(x))
+    assert np.allclose(ease.grid_to_map(rows.start, cols.start), (x[0], y[0]))
@@ -0,0 +1,61 @@
+# Unit Testing for lazy imports
+import subprocess
+import sys
+from swepy.lazy import LazyModule, lazy_import
+
+
+def imported_after(statement):
+    """
+    Heavy modules loaded by statement in a fresh interpreter
+    """
+    heavy = [
+        "pandas",
+        "xarray",
+        "zarr",
+        "fsspec",
+        "matplotlib",
+        "nco",
+        "osgeo",
+        "requests",
+        "netCDF4",
+        "tqdm",
+    ]
+    code = "import sys\n{}\nprint(' '.join(m for m in {} if m in sys.modules))"
+    out = subprocess.run(
+        [sys.executable, "-c", code.format(statement, heavy)],
+        stdout=subprocess.PIPE,
+        check=True,
+        universal_newlines=True,
+    )
+    return out.stdout.split()
+
+
+def test_lazy_import_loaded():
+    assert lazy_import("sys") is sys
+
+
+def test_lazy_import_deferred():
+    module = lazy_import("swepy.tests.no_such_module")
+    assert isinstance(module, LazyModule)
+    try:
+        module.anything
+    except ImportError:
+        pass
+    else:
+        raise AssertionError("attribute access did not import the module")
+
+
+def test_lazy_import_attribute():
+    json = LazyModule("json")
+    assert json.loads("[1]") == [1]
+    assert "loaded" in repr(json)
+
+
+def test_pipeline_import_is_light():
+    assert imported_after("import swepy.pipeline") == []
+
+
+def test_analysis_import_is_light():
+    assert "matplotlib" not in imported_after(
+        "import swepy.analysis, swepy.classify"
+    )
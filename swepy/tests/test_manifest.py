@@ -0,0 +1,119 @@
+import os
+import datetime
+import sqlite3
+import pytest
+from swepy.manifest import Manifest, file_checksum
+from swepy.nsidcDownloader import nsidcDownloader
+
+
+local_file = {
+    "protocol": "http",
+    "server": "localhost:8000",
+    "resolution": "6.25km",
+    "platform": "F17",
+    "sensor": "SSMIS",
+    "date1": datetime.date(2010, 1, 1),
+    "date2": datetime.date(2010, 1, 1),
+    "channel": "19H",
+}
+local_name = "NSIDC-0630-EASE2_N6.25km-F17_SSMIS-2010001-19H-M-SIR-CSU-v1.3.nc"
+
+
+def test_record_get(tmpdir):
+    """
+    Ensure recorded fields are returned and later records update them
+    """
+    m = Manifest(str(tmpdir.join("manifest.db")))
+    m.record("a.nc", url="http://a", status="failed")
+    m.record("a.nc", status="downloaded", size=10)
+    entry = m.get("a.nc")
+    assert (entry["url"], entry["status"], entry["size"]) == (
+        "http://a",
+        "downloaded",
+        10,
+    )
+
+
+def test_record_bad_column(tmpdir):
+    """
+    Ensure unknown columns are rejected
+    """
+    m = Manifest(str(tmpdir.join("manifest.db")))
+    with pytest.raises(KeyError):
+        m.record("a.nc", colour="blue")
+
+
+def test_missing(tmpdir):
+    """
+    Ensure only files on disk with a good status count as present
+    """
+    m = Manifest(str(tmpdir.join("manifest.db")))
+    tmpdir.join("b.nc").write("b")
+    tmpdir.join("c.nc").write("c")
+    m.record("b.nc", status="downloaded", path=str(tmpdir.join("b.nc")))
+    m.record("c.nc", status="failed", path=str(tmpdir.join("c.nc")))
+    m.record("d.nc", status="subset", path=str(tmpdir.join("d.nc")))
+    assert m.missing(["a.nc", "b.nc", "c.nc", "d.nc"]) == [
+        "a.nc",
+        "c.nc",
+        "d.nc",
+    ]
+
+
+def test_download_recorded(tmpdir):
+    """
+    Ensure downloads are recorded with their size and checksum
+    """
+    m = Manifest(str(tmpdir.join("manifest.db")))
+    nD = nsidcDownloader(folder=str(tmpdir), no_auth=True, manifest=m)
+    nD.download_file(**local_file)
+    path = str(tmpdir.join(local_name))
+    entry = m.get(local_name)
+    assert entry["status"] == "downloaded" and entry["platform"] == "F17"
+    assert entry["size"] == os.path.getsize(path)
+    assert entry["checksum"] == file_checksum(path)
+
+
+def test_download_skipped(tmpdir, monkeypatch):
+    """
+    Ensure files the manifest lists as downloaded are not requested again
+    """
+    m = Manifest(str(tmpdir.join("manifest.db")))
+    nD = nsidcDownloader(folder=str(tmpdir), no_auth=True, manifest=m)
+    nD.download_file(**local_file)
+
+    def no_request(*args):
+        raise AssertionError("file requested again")
+
+    monkeypatch.setattr(nD, "_retry_fetch", no_request)
+    assert nD.download_file(**local_file) == [local_name, True]
+
+
+def test_close_reopens(tmpdir):
+    """
+    Ensure a closed manifest opens again on the next use
+    """
+    m = Manifest(str(tmpdir.join("manifest.db")))
+    m.record("a.nc", status="subset", bounds="1.0,2.0,3.0,4.0")
+    m.close()
+    m.close()
+    assert m.get("a.nc")["bounds"] == "1.0,2.0,3.0,4.0"
+
+
+def test_old_manifest_upgraded(tmpdir):
+    """
+    Ensure a manifest written without the bounds column gains it
+    """
+    path = str(tmpdir.join("manifest.db"))
+    conn = sqlite3.connect(path)
+    with conn:
+        conn.execute(
+            "CREATE TABLE files (filename TEXT PRIMARY KEY, url TEXT, "
+            "date TEXT, channel TEXT, platform TEXT, sensor TEXT, "
+            "size INTEGER, checksum TEXT, status TEXT, path TEXT)"
+        )
+        conn.execute("INSERT INTO files (filename) VALUES ('a.nc')")
+    conn.close()
+    m = Manifest(path)
+    m.record("a.nc", status="subset", bounds="x")
+    assert m.get("a.nc")["bounds"] == "x"
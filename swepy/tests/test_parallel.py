@@ -0,0 +1,47 @@
+import swepy.parallel as parallel
+import numpy as np
+import os
+from functools import partial
+
+
+def test_map_blocks_output():
+    """
+    Ensure blocks written by the workers land in the right place
+    """
+    cube = np.arange(60.0).reshape(3, 4, 5)
+    out = parallel.map_blocks(np.sqrt, cube, dtype=np.float64, workers=3)
+    assert np.allclose(out, np.sqrt(cube))
+
+
+def test_map_blocks_results():
+    """
+    Ensure results are returned in block order without an output
+    """
+    cube = np.ones((2, 3, 7))
+    parts = parallel.map_blocks(
+        partial(np.sum, axis=(1, 2)), cube, axis=2, workers=3
+    )
+    assert [list(p) for p in parts] == [[6, 6], [6, 6], [9, 9]]
+
+
+def test_share_memmap(tmpdir):
+    """
+    Ensure a file backed cube is shared without a copy and kept
+    """
+    path = str(tmpdir.join("cube.dat"))
+    cube = np.memmap(path, dtype=np.float32, mode="w+", shape=(2, 3, 4))
+    shared = parallel.share(cube)
+    assert shared[0] == path and shared[4] is False
+    parallel.release(shared)
+    assert os.path.exists(path)
+
+
+def test_share_masked():
+    """
+    Ensure masked values are shared as nan and temp files are removed
+    """
+    cube = np.ma.masked_equal(np.arange(4).reshape(1, 2, 2), 0)
+    shared = parallel.share(cube)
+    assert np.isnan(parallel.open_shared(shared)[0, 0, 0])
+    parallel.release(shared)
+    assert not os.path.exists(shared[0])
@@ -1,12 +1,21 @@
 # Unit Testing for SWEpy pipeline
 import os
-from swepy.pipeline import Swepy
+from swepy.pipeline import (
+    Swepy,
+    subset_netcdf,
+    read_subset,
+    append_netcdf,
+    last_time,
+    concat_netcdf,
+)
 from swepy.nsidcDownloader import nsidcDownloader
 import glob
 import pytest
 import datetime
 import numpy as np
 from shutil import copy
+from netCDF4 import Dataset
+import xarray
 
 
 @pytest.fixture
@@ -549,6 +558,118 @@ def test_scrape():
     ]
 
 
+def test_scrape_concurrent():
+    """
+    Ensure a concurrent scrape keeps both channels in date order
+    """
+    date = datetime.date(2010, 1, 1)
+    s1 = Swepy(os.getcwd(), ul="N", lr="N")
+    s1.set_login("test", "test")
+    s1.set_dates(date, date)
+    s1.scrape(max_workers=2)
+    assert s1.down19list == [
+        "NSIDC-0630-EASE2_N6.25km-F17_SSMIS-2010001-19H-M-SIR-CSU-v1.3.nc"
+    ] and s1.down37list == [
+        "NSIDC-0630-EASE2_N3.125km-F17_SSMIS-2010001-37H-M-SIR-CSU-v1.3.nc"
+    ]
+
+
+def test_scrape_failures():
+    """
+    Ensure missing files are recorded as failures instead of aborting scrape
+    """
+    date = datetime.date(2010, 1, 2)
+    s1 = Swepy(os.getcwd(), ul="N", lr="N")
+    s1.set_login("test", "test")
+    s1.set_dates(date, date)
+    assert len(s1.scrape(max_workers=2)) == 2
+    assert s1.down19list == [] and [
+        f["channel"] for f in s1.failed_downloads
+    ] == ["19H", "37H"]
+    # the ledger only covers the latest scrape
+    s1.scrape(max_workers=2)
+    assert len(s1.failed_downloads) == 2
+
+
+def test_scrape_auth_error(monkeypatch):
+    """
+    Ensure bad credentials stop the scrape instead of failing file by file
+    """
+    date = datetime.date(2010, 1, 1)
+    s1 = Swepy(os.getcwd(), ul="N", lr="N")
+    s1.set_login("test", "test")
+    s1.set_dates(date, date)
+
+    def denied(**kwargs):
+        raise PermissionError("Bad NASA Earthdata Authentication!")
+
+    monkeypatch.setattr(s1.nD, "download_file", denied)
+    with pytest.raises(PermissionError):
+        s1.scrape()
+    assert s1.failed_downloads == []
+
+
+def test_scrape_resumes_subset(tmpdir, monkeypatch):
+    """
+    Ensure files the manifest lists as subset are not downloaded again
+    """
+    monkeypatch.chdir(str(tmpdir))
+    date = datetime.date(2010, 1, 1)
+    s1 = Swepy(str(tmpdir), ul="N", lr="N")
+    s1.set_login("test", "test")
+    s1.set_dates(date, date)
+    name = s1.get_filename(s1.dates[0], "19H")
+    tmpdir.join(name).write("subset")
+    s1.manifest.record(name, status="subset", path=str(tmpdir.join(name)))
+    s1.scrape()
+    assert s1.sub19list == [str(tmpdir.join(name))] and s1.down19list == []
+    assert len(s1.down37list) == 1
+
+
+def test_subset_other_bounds_redone(tmpdir, monkeypatch):
+    """
+    Ensure files subset for another study area are downloaded again
+    """
+    monkeypatch.chdir(str(tmpdir))
+    date = datetime.date(2010, 1, 1)
+    s1 = Swepy(str(tmpdir), ul=[66, -145], lr=[71, -166], resume=True)
+    s1.set_login("test", "test")
+    s1.set_dates(date, date)
+    name = s1.get_filename(s1.dates[0], "19H")
+    tmpdir.join(name).write("subset")
+    s1.manifest.record(
+        name, status="subset", path=str(tmpdir.join(name)), bounds="0,0,1,1"
+    )
+    assert s1.subset_done(s1.dates[0], "19H") is None
+    s1.manifest.record(name, bounds=s1.subset_bounds())
+    assert s1.subset_done(s1.dates[0], "19H") == str(tmpdir.join(name))
+
+
+def test_resume_opt_in(tmpdir, monkeypatch):
+    """
+    Ensure the manifest only outlives the Swepy object with resume=True
+    """
+    monkeypatch.chdir(str(tmpdir))
+    s1 = Swepy(str(tmpdir), resume=True)
+    s1.manifest.record("a.nc", status="subset")
+    s1.close()
+    assert Swepy(str(tmpdir), resume=True).manifest.get("a.nc") is not None
+    s2 = Swepy(str(tmpdir))
+    s2.manifest.record("b.nc", status="subset")
+    assert Swepy(str(tmpdir)).manifest.get("b.nc") is None
+
+
+def test_get_latlon(tmpdir, monkeypatch):
+    """
+    Ensure pixel lat/lons come from the lookup window of the subset
+    """
+    monkeypatch.chdir(str(tmpdir))
+    s1 = Swepy(str(tmpdir), ul=[66, -145], lr=[71, -166], high_res=False)
+    lats, lons = s1.get_latlon(folder=str(tmpdir.join("cache")))
+    assert lats.shape == lons.shape and lats.size > 1
+    assert 60 < lats.mean() < 75 and -170 < lons.mean() < -140
+
+
 def test_subset():
     """
     Ensure files are moved to sub directory and have been reduced in size
@@ -575,6 +696,287 @@ def test_subset():
     assert os.stat(list1[0]).st_size < 100000
 
 
+data_19 = os.path.join(
+    os.path.dirname(__file__),
+    "data",
+    "NSIDC-0630-EASE2_N6.25km-F17_SSMIS-2010001-19H-M-SIR-CSU-v1.3.nc",
+)
+bounds = [-1800000.0, 2600000.0, -1500000.0, 2300000.0]
+
+
+def later_days(folder, days):
+    """
+    Write the 2010-01-01 test files shifted to later days of January 2010,
+    with every TB one kelvin warmer per day
+
+    The mock server only has 2010-01-01. The copies are written up front
+    because netCDF isn't thread safe and downloads run on threads.
+    """
+    data = os.path.join(os.path.dirname(__file__), "data")
+    for src in glob.glob(os.path.join(data, "*-2010001-*.nc")):
+        name = os.path.basename(src)
+        for day in days:
+            dst = os.path.join(
+                folder, name.replace("2010001", "201000%d" % day)
+            )
+            copy(src, dst)
+            with Dataset(dst, "r+") as f:
+                f["time"][:] = f["time"][:] + day - 1
+                f["TB"][:] = f["TB"][:] + day - 1
+
+
+def test_subset_netcdf(tmpdir):
+    """
+    Ensure the in process engine keeps only the pixels inside the bounds
+    """
+    out = subset_netcdf(data_19, str(tmpdir.join("sub.nc")), bounds)
+    with Dataset(data_19) as src, Dataset(out) as dst:
+        x = src["x"][:]
+        y = src["y"][:]
+        xi = np.where((x >= bounds[0]) & (x <= bounds[2]))[0]
+        yi = np.where((y >= bounds[3]) & (y <= bounds[1]))[0]
+        expected = src["TB"][:, yi[0] : yi[-1] + 1, xi[0] : xi[-1] + 1]
+        assert dst["TB"].shape == expected.shape
+        assert np.ma.allequal(dst["TB"][:], expected)
+        assert dst.dimensions["time"].isunlimited()
+        assert "crs" in dst.variables
+
+
+def test_read_subset(tmpdir):
+    """
+    Ensure the in memory subset matches the written one
+    """
+    tb = read_subset(data_19, bounds)
+    out = subset_netcdf(data_19, str(tmpdir.join("sub.nc")), bounds)
+    with Dataset(out) as dst:
+        assert np.ma.allequal(tb, dst["TB"][:])
+
+
+def test_subset_netcdf_outside():
+    """
+    Ensure bounds that miss the file raise ValueError
+    """
+    with pytest.raises(ValueError):
+        read_subset(data_19, [0.0, 10.0, 10.0, 0.0])
+
+
+def test_subset_workers(tmpdir, monkeypatch):
+    """
+    Ensure a parallel subset keeps channels apart and removes its inputs
+    """
+    monkeypatch.chdir(str(tmpdir))
+    s1 = Swepy(str(tmpdir), ul=[66, -145], lr=[71, -166])
+    data = os.path.dirname(data_19)
+    names = sorted(f for f in os.listdir(data) if f.endswith(".nc"))
+    for name in names:
+        copy(os.path.join(data, name), s1.wget)
+    s1.down37list, s1.down19list = [names[0]], [names[1]]
+    s1.subset(engine="netcdf", workers=2)
+    assert s1.sub19list == [s1.path19 + names[1]]
+    assert s1.sub37list == [s1.path37 + names[0]]
+    assert os.listdir(s1.wget) == []
+
+
+def test_subset_failure_keeps_input(tmpdir, monkeypatch):
+    """
+    Ensure an input that can't be subset is reported and not deleted
+    """
+    monkeypatch.chdir(str(tmpdir))
+    s1 = Swepy(str(tmpdir), ul=[66, -145], lr=[71, -166])
+    tmpdir.join("data", "wget", "bad-2010001-19H.nc").write("not netcdf")
+    s1.down19list = ["bad-2010001-19H.nc"]
+    s1.subset(engine="netcdf", workers=2)
+    assert s1.sub19list == [] and os.listdir(s1.wget) == ["bad-2010001-19H.nc"]
+    assert s1.failed_subsets == [s1.wget + "bad-2010001-19H.nc"]
+    # the ledger only covers the latest call
+    s1.down19list = ["bad-2010001-19H.nc"]
+    s1.subset(engine="netcdf")
+    assert s1.failed_subsets == [s1.wget + "bad-2010001-19H.nc"]
+
+
+def test_append_netcdf(tmpdir):
+    """
+    Ensure appending grows the time dimension and keeps earlier steps
+    """
+    out = str(tmpdir.join("out.nc"))
+    append_netcdf(out, data_19)
+    append_netcdf(out, data_19)
+    with Dataset(data_19) as src, Dataset(out) as dst:
+        assert len(dst.dimensions["time"]) == 2 * len(src.dimensions["time"])
+        assert np.ma.allequal(dst["TB"][-1], src["TB"][0])
+        assert np.ma.allequal(dst["TB"][0], src["TB"][0])
+
+
+def test_stream_all(tmpdir, monkeypatch):
+    """
+    Ensure the streamed workflow appends every day it could fetch and
+    records the ones it could not
+    """
+    monkeypatch.chdir(str(tmpdir))
+    s1 = Swepy(str(tmpdir), ul=[66, -145], lr=[71, -166])
+    s1.set_login("test", "test")
+    s1.set_dates(datetime.date(2010, 1, 1), datetime.date(2010, 1, 2))
+    out19, out37 = s1.scrape_all(max_workers=2, workers=2, stream=True)
+    with Dataset(out19) as f19, Dataset(out37) as f37:
+        assert len(f19.dimensions["time"]) == 1
+        assert len(f37.dimensions["time"]) == 1
+        assert f19["TB"].shape[1] < 227
+    assert [f["channel"] for f in s1.failed_downloads] == ["19H", "37H"]
+    assert glob.glob(str(tmpdir.join("*.nc"))) == []
+
+
+def test_stream_callback_error(tmpdir, monkeypatch):
+    """
+    Ensure an error while recording a subset is raised instead of hanging
+    the appender
+    """
+    monkeypatch.chdir(str(tmpdir))
+    s1 = Swepy(str(tmpdir), ul=[66, -145], lr=[71, -166])
+    s1.set_login("test", "test")
+    s1.set_dates(datetime.date(2010, 1, 1), datetime.date(2010, 1, 1))
+    record = s1.manifest.record
+
+    def broken_record(filename, **fields):
+        if fields.get("status") == "subset":
+            raise OSError("disk full")
+        return record(filename, **fields)
+
+    monkeypatch.setattr(s1.manifest, "record", broken_record)
+    with pytest.raises(OSError):
+        s1.stream_all(engine="netcdf", max_workers=2, workers=2)
+
+
+def test_stream_feeder_error(tmpdir, monkeypatch):
+    """
+    Ensure an error while queueing a job is raised instead of hanging the
+    appender
+    """
+    monkeypatch.chdir(str(tmpdir))
+    s1 = Swepy(str(tmpdir), ul=[66, -145], lr=[71, -166])
+    s1.set_login("test", "test")
+    s1.set_dates(datetime.date(2010, 1, 1), datetime.date(2010, 1, 2))
+    subset_done = s1.subset_done
+
+    def broken_lookup(date, channel):
+        if date.day == 2:
+            raise KeyError(date.year)
+        return subset_done(date, channel)
+
+    monkeypatch.setattr(s1, "subset_done", broken_lookup)
+    with pytest.raises(KeyError):
+        s1.stream_all(engine="netcdf", max_workers=2, workers=2)
+
+
+def test_update(tmpdir, monkeypatch):
+    """
+    Ensure update only appends the days after the last one in the outputs
+    """
+    monkeypatch.chdir(str(tmpdir))
+    s1 = Swepy(str(tmpdir), ul=[66, -145], lr=[71, -166])
+    s1.set_login("test", "test")
+    s1.set_dates(datetime.date(2010, 1, 1), datetime.date(2010, 1, 1))
+    out19, out37 = s1.update(engine="netcdf")
+    assert last_time(out19) == datetime.datetime(2010, 1, 1)
+    s1.dates = None
+    s1.update(end=datetime.date(2010, 1, 1), engine="netcdf")
+    with Dataset(out19) as f19, Dataset(out37) as f37:
+        assert len(f19.dimensions["time"]) == 1
+        assert len(f37.dimensions["time"]) == 1
+        first19 = f19["TB"][0]
+    assert s1.failed_downloads == []
+
+    pool = str(tmpdir.mkdir("pool"))
+    later_days(pool, [2])
+
+    def next_day(**file):
+        name = s1.nD.format_url(**file).split("/")[-1]
+        copy(os.path.join(pool, name), name)
+        return [name, True]
+
+    monkeypatch.setattr(s1.nD, "download_file", next_day)
+    s1.update(end=datetime.date(2010, 1, 2), engine="netcdf")
+    assert last_time(out19) == datetime.datetime(2010, 1, 2)
+    with Dataset(out19) as f19, Dataset(out37) as f37:
+        assert len(f19.dimensions["time"]) == 2
+        assert len(f37.dimensions["time"]) == 2
+        assert np.all(np.diff(f19["time"][:]) == 1)
+        assert np.allclose(f19["TB"][0], first19)
+        assert np.allclose(f19["TB"][1], first19 + 1)
+    assert s1.failed_downloads == []
+
+
+def test_update_stops_at_failure(tmpdir, monkeypatch):
+    """
+    Ensure update keeps both outputs in step and stops at the first failed
+    day, so the next run resumes there
+    """
+    monkeypatch.chdir(str(tmpdir))
+    s1 = Swepy(str(tmpdir), ul=[66, -145], lr=[71, -166])
+    s1.set_login("test", "test")
+    s1.set_dates(datetime.date(2010, 1, 1), datetime.date(2010, 1, 1))
+    out19, out37 = s1.update(engine="netcdf")
+    s1.dates = None
+    pool = str(tmpdir.mkdir("pool"))
+    later_days(pool, [2, 3])
+    broken = [True]
+
+    def later_day(**file):
+        # 19H of the 2nd fails while broken
+        if broken[0] and file["channel"] == "19H" and file["date1"].day == 2:
+            raise OSError("connection reset")
+        name = s1.nD.format_url(**file).split("/")[-1]
+        copy(os.path.join(pool, name), name)
+        return [name, True]
+
+    monkeypatch.setattr(s1.nD, "download_file", later_day)
+    s1.update(end=datetime.date(2010, 1, 3), engine="netcdf")
+    assert last_time(out19) == datetime.datetime(2010, 1, 1)
+    assert last_time(out37) == datetime.datetime(2010, 1, 1)
+    assert [(f["channel"], f["date"].day) for f in s1.failed_downloads] == [
+        ("19H", 2)
+    ]
+    broken[0] = False
+    s1.update(end=datetime.date(2010, 1, 3), engine="netcdf")
+    with Dataset(out19) as f19, Dataset(out37) as f37:
+        assert np.all(np.diff(f19["time"][:]) == 1)
+        assert np.all(f19["time"][:] == f37["time"][:])
+        assert len(f19.dimensions["time"]) == 3
+    assert s1.failed_downloads == []
+
+
+def test_update_unknown_sensor(tmpdir, monkeypatch):
+    """
+    Ensure update refuses an end date get_sensor can't resolve
+    """
+    monkeypatch.chdir(str(tmpdir))
+    s1 = Swepy(str(tmpdir), ul=[66, -145], lr=[71, -166])
+    s1.set_login("test", "test")
+    s1.set_dates(datetime.date(2010, 1, 1), datetime.date(2010, 1, 1))
+    assert s1.update(end=datetime.date(2030, 1, 1)) == (None, None)
+    assert not os.path.exists(str(tmpdir.join("data", s1.outfile_19)))
+
+
+def test_stream_zarr(tmpdir, monkeypatch):
+    """
+    Ensure days are written straight into the zarr stores, failed days
+    staying at the fill value
+    """
+    monkeypatch.chdir(str(tmpdir))
+    s1 = Swepy(str(tmpdir), ul=[66, -145], lr=[71, -166])
+    s1.set_login("test", "test")
+    s1.set_dates(datetime.date(2010, 1, 1), datetime.date(2010, 1, 2))
+    s1.scrape_all(max_workers=2, workers=2, to_zarr=True)
+    ds = xarray.open_zarr(str(tmpdir.join("data", "zarr19")))
+    tb = read_subset(data_19, s1.geo_list)
+    assert ds["TB"].shape == (2,) + tb.shape[1:]
+    assert np.allclose(
+        ds["TB"][0].values, tb[0].filled(np.nan), equal_nan=True
+    )
+    assert np.isnan(ds["TB"][1].values).all()
+    assert str(ds["time"].values[0])[:10] == "2010-01-01"
+    assert glob.glob(str(tmpdir.join("data", "*.nc"))) == []
+
+
 def test_concat():
     """
     Ensure files are renamed after concatenation occurs
@@ -604,6 +1006,39 @@ def test_concat():
 #     s1.concatenate()
 
 
+def test_concat_netcdf(tmpdir):
+    """
+    Ensure one pass concatenation places every input in its own time slice
+    """
+    sub = subset_netcdf(data_19, str(tmpdir.join("sub.nc")), bounds)
+    out = concat_netcdf([data_19, data_19, data_19], str(tmpdir.join("a.nc")))
+    with Dataset(data_19) as src, Dataset(out) as dst:
+        assert dst["TB"].shape == (3,) + src["TB"].shape[1:]
+        assert np.ma.allequal(dst["TB"][2], src["TB"][0])
+        assert dst.dimensions["time"].isunlimited()
+    out = concat_netcdf([sub, sub], str(tmpdir.join("b.nc")), workers=2)
+    with Dataset(sub) as src, Dataset(out) as dst:
+        assert np.ma.allequal(dst["TB"][1], src["TB"][0])
+
+
+def test_scrape_all_netcdf(tmpdir, monkeypatch):
+    """
+    Ensure the netcdf engine writes the outputs without batch files
+    """
+    monkeypatch.chdir(str(tmpdir))
+    s1 = Swepy(str(tmpdir), ul=[66, -145], lr=[71, -166])
+    s1.set_login("test", "test")
+    s1.nD.folder = s1.wget
+    s1.set_dates(datetime.date(2010, 1, 1), datetime.date(2010, 1, 1))
+    out19, out37 = s1.scrape_all(engine="netcdf", workers=2)
+    with Dataset(out19) as f19:
+        assert len(f19.dimensions["time"]) == 1
+    assert sorted(glob.glob(str(tmpdir.join("data", "*.nc")))) == [
+        str(tmpdir.join("data", "all_days_19H.nc")),
+        str(tmpdir.join("data", "all_days_37H.nc")),
+    ]
+
+
 def test_convert_zarr():
     """
     Ensure that a dictionary is returned (this could be more meaningful)
@@ -118,6 +118,36 @@ def test_apply_filter_mp_fail():
         process.apply_filter(tb19)
 
 
+def test_vector_filter_matches():
+    """
+    Ensure the vectorized filter matches the per pixel filter, with and
+    without tiles
+    """
+    rng = np.random.RandomState(0)
+    for t in [4, 30, 100]:
+        cube = rng.uniform(0, 60, (t, 6, 7))
+        cube[rng.rand(t, 6, 7) < 0.2] = np.nan
+        expected = process.__filter(cube)
+        assert np.allclose(
+            process.vector_filter(cube), expected, equal_nan=True
+        )
+        assert np.allclose(
+            process.vector_filter(cube, tile=(4, 3)), expected, equal_nan=True
+        )
+
+
+def test_time_fill():
+    """
+    Ensure time_fill forward fills masked values along time
+    """
+    cube = np.ma.masked_array(
+        np.arange(8.0).reshape(4, 2, 1), mask=[[[0], [1]], [[1], [0]]] * 2
+    )
+    filled = process.time_fill(cube)
+    assert np.isnan(filled[0, 1, 0])
+    assert filled[1, 0, 0] == 0 and filled[3, 0, 0] == 4
+
+
 def test_ocean_mask():
     """
     Ensure proper type is returned by ocean mask
@@ -154,3 +184,75 @@ def test_save(arrays, scraped_files):
     out = process.save_file(scraped_files[0], arrays[0], "process19.nc")
     fid = Dataset(out)
     assert fid.variables["TB"][:].all() == arrays[0].all()
+
+
+def test_get_array_memmap(scraped_files, tmpdir):
+    """
+    Ensure a cube read into a memmap matches the in memory one
+    """
+    for file in scraped_files:
+        tb = process.get_array(file)
+        cube = process.get_array(file, out=str(tmpdir.join("tb.npy")), block=1)
+        assert isinstance(cube, np.memmap) and cube.shape == tb.shape
+        assert np.allclose(cube, tb.filled(np.nan), equal_nan=True)
+
+
+def test_out_of_core_chain(tmpdir):
+    """
+    Ensure the file backed steps give the in memory results
+    """
+    rng = np.random.RandomState(1)
+    tb19 = rng.uniform(0, 60, (20, 9, 8)).astype(np.float32)
+    tb37 = rng.uniform(0, 30, (20, 9, 9)).astype(np.float32)
+    swe = process.safe_subtract(tb19, tb37)
+    disk = process.safe_subtract(
+        tb19, tb37, out=str(tmpdir.join("swe.npy")), block=7
+    )
+    assert np.allclose(disk, swe)
+    smooth = process.apply_filter(
+        disk, workers=2, out=str(tmpdir.join("smooth.npy")), tile=(8, 3)
+    )
+    assert np.allclose(smooth, process.vector_filter(swe))
+    assert np.allclose(np.load(str(tmpdir.join("smooth.npy"))), smooth)
+    vector = process.apply_filter(
+        disk, engine="vector", out=str(tmpdir.join("v.npy")), tile=(4, 4)
+    )
+    assert np.allclose(vector, smooth)
+
+
+def test_dask_chain(scraped_files, tmpdir):
+    """
+    Ensure the lazy dask chain gives the eager results
+    """
+    da = pytest.importorskip("dask.array")
+    tb19 = process.get_array(scraped_files[0], chunks=50)
+    tb37 = process.get_array(scraped_files[1], chunks=(40, 60))
+    assert isinstance(tb19, da.Array) and tb19.chunks[1][0] == 50
+    eager19 = process.get_array(scraped_files[0]).filled(np.nan)
+    eager37 = process.get_array(scraped_files[1]).filled(np.nan)
+    assert tb37.shape == eager37.shape
+    assert np.allclose(tb19.compute(), eager19, equal_nan=True)
+    assert np.allclose(tb37.compute(), eager37, equal_nan=True, atol=1e-3)
+    clean = process.vector_clean(tb19)
+    assert np.allclose(
+        clean.compute(), process.vector_clean(eager19.copy()), equal_nan=True
+    )
+    cube = da.from_array(np.random.RandomState(2).uniform(0, 60, (30, 8, 9)))
+    smooth = process.apply_filter(cube.rechunk((10, 4, 4)))
+    assert np.allclose(smooth.compute(), process.vector_filter(cube.compute()))
+    out = process.save_file(
+        scraped_files[0], tb19, str(tmpdir.join("lazy.nc"))
+    )
+    with Dataset(out) as fid:
+        # TB is saved in the file's integer type
+        assert np.allclose(fid["TB"][:], np.trunc(eager19), equal_nan=True)
+
+
+def test_vector_clean_blocks():
+    """
+    Ensure zeros and nans are filled from the left, the same in time blocks
+    """
+    cube = np.array([[[1.0, 0.0, np.nan, 4.0]], [[2.0, np.nan, 0.0, 0.0]]] * 3)
+    expected = np.array([[[1.0, 1.0, 1.0, 4.0]], [[2.0, 2.0, 2.0, 2.0]]] * 3)
+    assert np.array_equal(process.vector_clean(cube.copy()), expected)
+    assert np.array_equal(process.vector_clean(cube, block=4), expected)